@@ -2,9 +2,108 @@ import os
 from datetime import timedelta
 
 
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here") 
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# Access tokens are short-lived ES256 JWTs; sessions continue through rotating refresh tokens
+ALGORITHM = "ES256"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "10"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# A refresh token presented again this soon after its first use (two tabs
+# refreshing together, a retried request) gets new tokens instead of
+# revoking its family
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_TOKEN_REUSE_GRACE_SECONDS", "10"))
+JWT_ISSUER = os.getenv("JWT_ISSUER", "flowspace-api")
+# Signing keys, shared by every worker and node; see app/core/keys.py
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "jwt_keys")
+JWT_KEYS_RELOAD_SECONDS = float(os.getenv("JWT_KEYS_RELOAD_SECONDS", "60"))
+# How long verifiers may cache /.well-known/jwks.json. A new key is only
+# published for that long (plus a reload interval, for every worker to
+# notice it) before it starts signing, so no cached JWKS lacks it
+JWKS_MAX_AGE_SECONDS = int(os.getenv("JWKS_MAX_AGE_SECONDS", "300"))
+JWT_KEY_ACTIVATION_SECONDS = float(os.getenv(
+    "JWT_KEY_ACTIVATION_SECONDS", str(JWKS_MAX_AGE_SECONDS + JWT_KEYS_RELOAD_SECONDS)
+))
+JWT_CLAIMS_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CLAIMS_CACHE_MAX_ENTRIES", "10000"))
+
+# Password hashing runs in a process pool; 0 workers means one per CPU core
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", "0"))
+HASH_POOL_MAX_QUEUE = int(os.getenv("HASH_POOL_MAX_QUEUE", "64"))
+
+# Password hash scheme (bcrypt or argon2, i.e. Argon2id) and its cost; stored
+# hashes made otherwise are replaced at sign-in. Pick the costs for your
+# hardware with `python -m app.core.passwords calibrate`
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")
+PASSWORD_HASH_BUDGET_MS = float(os.getenv("PASSWORD_HASH_BUDGET_MS", "250"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST_KIB = int(os.getenv("ARGON2_MEMORY_COST_KIB", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+
+# Image decoding and resizing runs in its own process pool; 0 workers means one per core
+IMAGE_POOL_WORKERS = int(os.getenv("IMAGE_POOL_WORKERS", "0"))
+IMAGE_POOL_MAX_QUEUE = int(os.getenv("IMAGE_POOL_MAX_QUEUE", "16"))
+
+# Uploads larger than this spill from memory to a temp file while streaming in
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+# Post-response background jobs, persisted to a local SQLite file
+JOB_QUEUE_DB_PATH = os.getenv("JOB_QUEUE_DB_PATH", "jobs.db")
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "8"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "100"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+
+# In-process token blacklist: incremental sync interval and Bloom filter sizing
+TOKEN_BLACKLIST_SYNC_SECONDS = float(os.getenv("TOKEN_BLACKLIST_SYNC_SECONDS", "5"))
+TOKEN_BLACKLIST_REBUILD_SECONDS = float(os.getenv("TOKEN_BLACKLIST_REBUILD_SECONDS", "3600"))
+TOKEN_BLACKLIST_BLOOM_CAPACITY = int(os.getenv("TOKEN_BLACKLIST_BLOOM_CAPACITY", "100000"))
+TOKEN_BLACKLIST_BLOOM_ERROR_RATE = float(os.getenv("TOKEN_BLACKLIST_BLOOM_ERROR_RATE", "0.001"))
+
+# Expired blacklist rows are purged by one worker at a time, in batches, on an adaptive interval
+TOKEN_CLEANUP_MIN_INTERVAL_SECONDS = float(os.getenv("TOKEN_CLEANUP_MIN_INTERVAL_SECONDS", "60"))
+TOKEN_CLEANUP_MAX_INTERVAL_SECONDS = float(os.getenv("TOKEN_CLEANUP_MAX_INTERVAL_SECONDS", "3600"))
+TOKEN_CLEANUP_BATCH_SIZE = int(os.getenv("TOKEN_CLEANUP_BATCH_SIZE", "1000"))
+TOKEN_CLEANUP_TIME_BUDGET_SECONDS = float(os.getenv("TOKEN_CLEANUP_TIME_BUDGET_SECONDS", "10"))
+TOKEN_CLEANUP_TARGET_ROWS = int(os.getenv("TOKEN_CLEANUP_TARGET_ROWS", "5000"))
+
+# Per-process cache of user rows read by the auth dependency
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+# Optional local SQLite read replica of the users table, kept current from updated_at
+USER_REPLICA_ENABLED = os.getenv("USER_REPLICA_ENABLED", "false").lower() in ("1", "true", "yes")
+USER_REPLICA_DB_PATH = os.getenv("USER_REPLICA_DB_PATH", "users_replica.db")
+USER_REPLICA_SYNC_SECONDS = float(os.getenv("USER_REPLICA_SYNC_SECONDS", "10"))
+USER_REPLICA_REBUILD_SECONDS = float(os.getenv("USER_REPLICA_REBUILD_SECONDS", "3600"))
+
+# Boards: rank keys longer than this get their list respaced in the background
+RANK_REBALANCE_LENGTH = int(os.getenv("RANK_REBALANCE_LENGTH", "24"))
+BOARD_OWNER_CACHE_MAX_ENTRIES = int(os.getenv("BOARD_OWNER_CACHE_MAX_ENTRIES", "10000"))
+
+# Per-process rate limits as "<requests>/<seconds>" token buckets; empty disables one
+RATE_LIMIT_SIGNIN_PER_IP = os.getenv("RATE_LIMIT_SIGNIN_PER_IP", "20/60")
+RATE_LIMIT_SIGNIN_PER_EMAIL = os.getenv("RATE_LIMIT_SIGNIN_PER_EMAIL", "5/60")
+RATE_LIMIT_SIGNUP_PER_IP = os.getenv("RATE_LIMIT_SIGNUP_PER_IP", "5/60")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Number of proxies in front of the API that append to X-Forwarded-For; the
+# client address is the entry that many from the right. 0 ignores the header,
+# which clients can otherwise spoof. RATE_LIMIT_TRUST_FORWARDED_FOR=true means 1
+RATE_LIMIT_TRUSTED_PROXY_HOPS = int(os.getenv(
+    "RATE_LIMIT_TRUSTED_PROXY_HOPS",
+    "1" if os.getenv("RATE_LIMIT_TRUST_FORWARDED_FOR", "false").lower() in ("1", "true", "yes") else "0",
+))
+
+# Startup: optional warm-up before /ready reports ready, and how long a readiness check is reused
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "false").lower() in ("1", "true", "yes")
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+READY_CHECK_CACHE_SECONDS = float(os.getenv("READY_CHECK_CACHE_SECONDS", "2"))
+
+# Logging: records are written by a background thread; identical failures are rate limited
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_MAX_SIZE = int(os.getenv("LOG_QUEUE_MAX_SIZE", "10000"))
+LOG_REPEAT_BURST = int(os.getenv("LOG_REPEAT_BURST", "5"))
+LOG_REPEAT_WINDOW_SECONDS = float(os.getenv("LOG_REPEAT_WINDOW_SECONDS", "60"))
 
 
 CORS_ORIGINS = [
@@ -18,5 +117,13 @@ CORS_ORIGINS = [
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
+# Shared keep-alive HTTP pool used by the async data layer
+SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "100"))
+SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "20"))
+SUPABASE_POOL_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "10"))
+SUPABASE_POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", "5"))
+
 
 API_KEY = os.getenv("API_KEY", "FlowSpace")
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""ES256 signing keys for access tokens, with rotation.
+
+Each key is a PEM-encoded P-256 private key in ``JWT_KEYS_DIR``, named
+``<kid>.pem``. Kids are UTC creation timestamps. Every key in the directory
+verifies and is published in the JWKS at once, but a key only starts
+signing ``JWT_KEY_ACTIVATION_SECONDS`` after it was created, so verifiers
+that cached the JWKS before it appeared have refetched it by then. The
+newest key past that point signs. To rotate, add a key with
+``python -m app.core.keys rotate``; workers notice within
+``JWT_KEYS_RELOAD_SECONDS``. Delete a retired key once every token it
+signed has expired.
+
+All workers and nodes must see the same directory. When it holds no keys,
+the first worker to start generates one and the rest wait for it.
+"""
+import argparse
+import base64
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import jwk
+from jose.backends.base import Key
+
+from app.core.config import ALGORITHM, JWT_KEYS_DIR, JWT_KEYS_RELOAD_SECONDS, JWT_KEY_ACTIVATION_SECONDS
+
+LOCK_NAME = ".generating"
+STALE_LOCK_SECONDS = 30
+GENERATE_WAIT_SECONDS = 10
+# Unknown kids that did not turn up on a reload are not looked for again for
+# this long; the table is cleared rather than grown past its cap
+MISSED_KID_SECONDS = 60
+MISSED_KID_MAX_ENTRIES = 1024
+
+
+def _b64url(value: int) -> str:
+    return base64.urlsafe_b64encode(value.to_bytes(32, "big")).rstrip(b"=").decode()
+
+
+KID_FORMAT = "%Y%m%dT%H%M%S%fZ"
+
+
+def new_kid() -> str:
+    return datetime.now(timezone.utc).strftime(KID_FORMAT)
+
+
+def _kid_time(kid: str) -> Optional[float]:
+    """The creation time a kid names, or None if it is not in KID_FORMAT"""
+    try:
+        return datetime.strptime(kid, KID_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def _created_at(path: Path) -> float:
+    """When a key was made, from its kid; the file's mtime for hand-named keys"""
+    created = _kid_time(path.stem)
+    return created if created is not None else path.stat().st_mtime
+
+
+def generate_key(directory: Path) -> str:
+    """Write a new P-256 key into ``directory``; returns its kid"""
+    directory.mkdir(parents=True, exist_ok=True)
+    kid = new_kid()
+    pem = ec.generate_private_key(ec.SECP256R1()).private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    # Written aside and renamed, so other workers never read half a key
+    tmp = directory / f".{kid}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(pem)
+    os.replace(tmp, directory / f"{kid}.pem")
+    return kid
+
+
+class KeyRing:
+    """The signing keys in a directory, reloaded when the directory changes"""
+
+    def __init__(self, directory: str, reload_seconds: float, activation_seconds: float):
+        self.directory = Path(directory)
+        self.reload_seconds = reload_seconds
+        self.activation_seconds = activation_seconds
+        self._signing: Dict[str, Key] = {}
+        self._verifying: Dict[str, Key] = {}
+        self._jwks: List[Dict[str, Any]] = []
+        # (created_at, kid), oldest first
+        self._created: List[Tuple[float, str]] = []
+        self._dir_mtime: Optional[float] = None
+        self._checked_at = 0.0
+        # kid -> monotonic time until which it is not looked for again
+        self._missed: Dict[str, float] = {}
+
+    def _ensure_key(self):
+        """Generate the first key, letting exactly one of the racing workers do it"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lock = self.directory / LOCK_NAME
+        deadline = time.monotonic() + GENERATE_WAIT_SECONDS
+        while not any(self.directory.glob("*.pem")):
+            try:
+                os.close(os.open(lock, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+            except FileExistsError:
+                if time.time() - lock.stat().st_mtime > STALE_LOCK_SECONDS:
+                    lock.unlink(missing_ok=True)
+                elif time.monotonic() > deadline:
+                    raise RuntimeError(f"Timed out waiting for a signing key in {self.directory}")
+                else:
+                    time.sleep(0.05)
+                continue
+            try:
+                if not any(self.directory.glob("*.pem")):
+                    generate_key(self.directory)
+            finally:
+                lock.unlink(missing_ok=True)
+
+    def _load(self):
+        self._ensure_key()
+        signing, verifying, jwks, created = {}, {}, [], []
+        for path in sorted(self.directory.glob("*.pem")):
+            kid = path.stem
+            private = serialization.load_pem_private_key(path.read_bytes(), password=None)
+            if not isinstance(private, ec.EllipticCurvePrivateKey) or private.curve.name != "secp256r1":
+                raise ValueError(f"{path} is not a P-256 key, which {ALGORITHM} requires")
+            public = private.public_key()
+            numbers = public.public_numbers()
+            public_pem = public.public_bytes(
+                serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+            )
+            created.append((_created_at(path), kid))
+            signing[kid] = jwk.construct(path.read_text(), ALGORITHM)
+            verifying[kid] = jwk.construct(public_pem.decode(), ALGORITHM)
+            jwks.append({
+                "kty": "EC",
+                "crv": "P-256",
+                "x": _b64url(numbers.x),
+                "y": _b64url(numbers.y),
+                "kid": kid,
+                "alg": ALGORITHM,
+                "use": "sig",
+            })
+        self._signing, self._verifying, self._jwks = signing, verifying, jwks
+        self._created = sorted(created)
+
+    def _refresh(self, force: bool = False):
+        """Reload if the directory changed; ``force`` looks now instead of on schedule"""
+        now = time.monotonic()
+        if not force and self._signing and now - self._checked_at < self.reload_seconds:
+            return
+        self._checked_at = now
+        mtime = self.directory.stat().st_mtime if self.directory.exists() else None
+        if mtime != self._dir_mtime or not self._signing:
+            self._load()
+            self._dir_mtime = self.directory.stat().st_mtime
+
+    def active_kid(self) -> str:
+        """The newest key that has been published long enough to sign.
+
+        When none has, as on a fresh install, the oldest key signs: no
+        verifier can have cached a JWKS from before it.
+        """
+        cutoff = time.time() - self.activation_seconds
+        active = [kid for created, kid in self._created if created <= cutoff]
+        return active[-1] if active else self._created[0][1]
+
+    def signing_key(self) -> Tuple[str, Key]:
+        """(kid, key) of the active signing key"""
+        self._refresh()
+        kid = self.active_kid()
+        return kid, self._signing[kid]
+
+    def _may_be_new(self, kid: Optional[str], now: float) -> bool:
+        """Whether an unknown kid could name a key added since the last reload.
+
+        Keys sign only after JWT_KEY_ACTIVATION_SECONDS, by which time the
+        scheduled reload has found them, except when the directory starts
+        over and its first key signs at once. So only kids in KID_FORMAT,
+        newer than every loaded key and not in the future, are worth an
+        early look; anything else a client sends is rejected without one.
+        """
+        created = _kid_time(kid) if kid else None
+        if created is None or created > time.time() + 60:
+            return False
+        if self._created and created <= self._created[-1][0]:
+            return False
+        return self._missed.get(kid, 0.0) <= now and now - self._checked_at > 1
+
+    def verification_key(self, kid: Optional[str]) -> Optional[Key]:
+        self._refresh()
+        key = self._verifying.get(kid)
+        now = time.monotonic()
+        if key is None and self._may_be_new(kid, now):
+            # Possibly a key another node just added; at most one look a
+            # second, and only a stat() unless the directory changed
+            self._refresh(force=True)
+            key = self._verifying.get(kid)
+            if key is None:
+                if len(self._missed) >= MISSED_KID_MAX_ENTRIES:
+                    self._missed.clear()
+                self._missed[kid] = now + MISSED_KID_SECONDS
+        return key
+
+    def jwks(self) -> Dict[str, Any]:
+        self._refresh()
+        return {"keys": list(self._jwks)}
+
+
+signing_keys = KeyRing(JWT_KEYS_DIR, JWT_KEYS_RELOAD_SECONDS, JWT_KEY_ACTIVATION_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage JWT signing keys")
+    parser.add_argument("command", choices=["rotate"])
+    parser.add_argument("--dir", default=JWT_KEYS_DIR)
+    args = parser.parse_args()
+    kid = generate_key(Path(args.dir))
+    print(f"New signing key {kid} in {args.dir}; published now, signing in {JWT_KEY_ACTIVATION_SECONDS:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Structured, non-blocking logging for the app.
+
+Request handlers never write to stdout themselves: ``logger.error(...)``
+only tags the record with the current request id, checks the repeat limit
+and puts the record on a bounded in-memory queue. A background thread
+formats records (as JSON lines by default) and writes them. When the queue
+is full, for example because stdout is stalled, records are dropped and
+counted rather than blocking the event loop.
+
+The same call site failing in the same way is logged at most
+``LOG_REPEAT_BURST`` times per ``LOG_REPEAT_WINDOW_SECONDS``. The first
+record through in the next window carries a ``suppressed`` count, so a
+Supabase outage produces a few lines a minute instead of one per request.
+"""
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import (
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_QUEUE_MAX_SIZE,
+    LOG_REPEAT_BURST,
+    LOG_REPEAT_WINDOW_SECONDS,
+)
+
+APP_LOGGER = "app"
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request id and extras"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        suppressed = getattr(record, "suppressed", None)
+        return f"{line} (+{suppressed} similar suppressed)" if suppressed else line
+
+
+class RepeatLimiter(logging.Filter):
+    """Lets each (call site, level, exception type) through ``burst`` times per window"""
+
+    def __init__(self, burst: int, window_seconds: float):
+        super().__init__()
+        self.burst = burst
+        self.window_seconds = window_seconds
+        self._windows: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0:
+            return True
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        key = (record.pathname, record.lineno, record.levelno, exc_type)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.window_seconds:
+                # window = [start, passed, suppressed]
+                if window is not None and window[2]:
+                    record.suppressed = window[2]
+                self._windows[key] = [now, 1, 0]
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the writer thread without formatting them or ever blocking"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the writer thread; only the request id has to
+        # be captured here, while the request's context is current
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _LogState:
+    def __init__(self):
+        self.handler: Optional[_NonBlockingQueueHandler] = None
+        self.listener: Optional[QueueListener] = None
+        self.limiter: Optional[RepeatLimiter] = None
+
+
+_state = _LogState()
+
+
+def setup_logging():
+    """Route the ``app`` loggers through the queue and start the writer thread; idempotent"""
+    if _state.listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_MAX_SIZE)
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+
+    handler = _NonBlockingQueueHandler(log_queue)
+    limiter = RepeatLimiter(LOG_REPEAT_BURST, LOG_REPEAT_WINDOW_SECONDS)
+    handler.addFilter(limiter)
+
+    logger = logging.getLogger(APP_LOGGER)
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _state.handler, _state.limiter = handler, limiter
+    _state.listener = QueueListener(log_queue, stream)
+    _state.listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    listener = _state.listener
+    if listener is None:
+        return
+    logging.getLogger(APP_LOGGER).removeHandler(_state.handler)
+    _state.listener = None
+    listener.stop()
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "queued": _state.handler.queue.qsize() if _state.handler else 0,
+        "dropped": _state.handler.dropped if _state.handler else 0,
+        "suppressed": _state.limiter.suppressed if _state.limiter else 0,
+    }
+
+
+class RequestIdMiddleware:
+    """ASGI middleware giving each request an id for its log lines.
+
+    A well-formed ``X-Request-ID`` from the caller (e.g. a load balancer) is
+    reused, otherwise one is generated; either way it is echoed back on the
+    response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                if 0 < len(value) <= MAX_REQUEST_ID_LENGTH and value.isascii() and value.decode().isprintable():
+                    request_id = value.decode()
+                break
+        request_id = request_id or uuid.uuid4().hex
+        header = (REQUEST_ID_HEADER, request_id.encode())
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), header]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
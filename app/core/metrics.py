@@ -0,0 +1,280 @@
+"""Prometheus-format metrics kept in plain per-process counters.
+
+Everything here runs on the event loop thread (pool timings are reported
+back to it), so updates need no locks. A histogram child is a fixed list of
+bucket counts plus a sum: observing a value is a bisect and two additions,
+and label children are created once and reused. Each worker process keeps
+and serves its own numbers; Prometheus aggregates across scrape targets.
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (
+    1024, 16 * 1024, 64 * 1024, 256 * 1024, 512 * 1024, 1024 ** 2, 2 * 1024 ** 2, 5 * 1024 ** 2, 10 * 1024 ** 2,
+)
+LOOP_LAG_INTERVAL_SECONDS = 0.5
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; cumulated only when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Any, Any] = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Child for these label values, created on first use"""
+        key = values[0] if len(values) == 1 else values
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _label_values(self, key) -> Tuple[str, ...]:
+        return key if isinstance(key, tuple) else (key,)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._children.items():
+            lines.extend(self._render_child(self._label_values(key), child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_label_text(self.labelnames, values)} {child.value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+    def set(self, value: float):
+        self._default.set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            bucket_labels = _label_text(self.labelnames, values, 'le="' + le + '"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        labels = _label_text(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {child.sum}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "flowspace_http_request_duration_seconds", "Time to serve a request, by route template",
+    ("method", "route", "status"),
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "flowspace_http_requests_in_flight", "Requests currently being served",
+))
+DB_CALL_SECONDS = registry.register(Histogram(
+    "flowspace_db_call_duration_seconds", "Supabase round trip time, by data layer function", ("call",),
+))
+DB_CALL_ERRORS = registry.register(Counter(
+    "flowspace_db_call_errors_total", "Supabase calls that raised, by data layer function", ("call",),
+))
+POOL_TASK_SECONDS = registry.register(Histogram(
+    "flowspace_pool_task_duration_seconds", "Time a worker process spent on a task, e.g. bcrypt or PIL", ("pool",),
+))
+POOL_WAIT_SECONDS = registry.register(Histogram(
+    "flowspace_pool_wait_duration_seconds", "Time a task waited for a worker process", ("pool",),
+))
+UPLOAD_BYTES = registry.register(Histogram(
+    "flowspace_upload_size_bytes", "Size of accepted file uploads", buckets=SIZE_BUCKETS,
+))
+TOKENS_PURGED = registry.register(Counter(
+    "flowspace_token_cleanup_purged_total", "Expired blacklist rows deleted by the cleanup scheduler",
+))
+TOKEN_CLEANUP_RUN_SECONDS = registry.register(Histogram(
+    "flowspace_token_cleanup_run_seconds", "Duration of a token cleanup run, all batches included",
+))
+EVENT_LOOP_LAG_SECONDS = registry.register(Histogram(
+    "flowspace_event_loop_lag_seconds", "How late the event loop ran a timer scheduled for now",
+))
+
+
+async def timed_execute(call: str, query):
+    """``await query.execute()``, recording its latency and any error under ``call``"""
+    start = time.perf_counter()
+    try:
+        return await query.execute()
+    except Exception:
+        DB_CALL_ERRORS.labels(call).inc()
+        raise
+    finally:
+        DB_CALL_SECONDS.labels(call).observe(time.perf_counter() - start)
+
+
+async def monitor_event_loop_lag(interval: float = LOOP_LAG_INTERVAL_SECONDS):
+    """Sleep for ``interval`` over and over and record how much later than asked each wake-up is"""
+    lag = EVENT_LOOP_LAG_SECONDS._default
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag.observe(max(0.0, time.perf_counter() - start - interval))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests.
+
+    Routes are labelled by their path template, so ids in URLs do not
+    create new series; requests that match no route share one label. The
+    histogram child for each route, method and status class is bound the
+    first time it is seen, so later requests skip building label values.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # path template -> method -> child per status class (index 1-5).
+        # Keyed by the path, since FastAPI's route objects are not hashable.
+        self._children: Dict[str, Dict[str, List[Optional[_HistogramChild]]]] = {}
+
+    def _child(self, path: str, method: str, status_class: int) -> _HistogramChild:
+        by_method = self._children.get(path)
+        if by_method is None:
+            by_method = self._children[path] = {}
+        by_status = by_method.get(method)
+        if by_status is None:
+            by_status = by_method[method] = [None] * 6
+        child = by_status[status_class]
+        if child is None:
+            child = by_status[status_class] = HTTP_REQUEST_SECONDS.labels(
+                method, path, _STATUS_CLASSES[status_class]
+            )
+        return child
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT._default
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            path: Optional[str] = getattr(scope.get("route"), "path", None)
+            self._child(path or "unmatched", scope["method"], status_code // 100).observe(
+                time.perf_counter() - start
+            )
+
+
+_STATUS_CLASSES = {n: f"{n}xx" for n in range(1, 6)}
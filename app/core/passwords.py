@@ -0,0 +1,163 @@
+"""Password hashing parameters, and a calibration tool for picking them.
+
+The default scheme (``PASSWORD_HASH_SCHEME``, bcrypt or argon2) hashes new
+passwords; the other one still verifies, so switching schemes needs no
+migration. A stored hash made with a different scheme or different cost
+parameters reports ``needs_update`` and is replaced on the user's next
+sign-in (app/services/password_rehash.py).
+
+Cost parameters should come from the hardware the API runs on, not from
+defaults. ``python -m app.core.passwords calibrate`` times hashes on the
+current machine and prints the settings that keep one verification within
+``PASSWORD_HASH_BUDGET_MS``. Each hash occupies one hashing pool worker for
+that long, so the budget also caps sign-ins at about
+``workers * 1000 / budget_ms`` per second.
+"""
+import argparse
+import os
+import secrets
+import statistics
+import time
+from typing import Any, Dict, Optional
+
+from passlib.context import CryptContext
+
+from app.core.config import (
+    PASSWORD_HASH_SCHEME,
+    PASSWORD_HASH_BUDGET_MS,
+    BCRYPT_ROUNDS,
+    ARGON2_TIME_COST,
+    ARGON2_MEMORY_COST_KIB,
+    ARGON2_PARALLELISM,
+    HASH_POOL_WORKERS,
+)
+
+SCHEMES = ("bcrypt", "argon2")
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 20
+ARGON2_MAX_TIME_COST = 10
+# OWASP's floor for Argon2id; calibration never goes below it
+ARGON2_MIN_MEMORY_KIB = 19 * 1024
+SAMPLES = 5
+
+
+def build_context(
+    scheme: str = PASSWORD_HASH_SCHEME,
+    bcrypt_rounds: int = BCRYPT_ROUNDS,
+    argon2_time_cost: int = ARGON2_TIME_COST,
+    argon2_memory_kib: int = ARGON2_MEMORY_COST_KIB,
+    argon2_parallelism: int = ARGON2_PARALLELISM,
+) -> CryptContext:
+    if scheme not in SCHEMES:
+        raise ValueError(f"PASSWORD_HASH_SCHEME must be one of {', '.join(SCHEMES)}, not {scheme!r}")
+    # Cost bounds pinned to the configured value, so hashes made with either
+    # more or less work than configured are flagged by needs_update
+    return CryptContext(
+        schemes=[scheme] + [s for s in SCHEMES if s != scheme],
+        deprecated="auto",
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__time_cost=argon2_time_cost,
+        argon2__min_rounds=argon2_time_cost,
+        argon2__max_rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_kib,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+pwd_context = build_context()
+
+
+def settings() -> Dict[str, Any]:
+    """The parameters new hashes are made with, for /stats"""
+    if PASSWORD_HASH_SCHEME == "argon2":
+        params = {
+            "time_cost": ARGON2_TIME_COST,
+            "memory_kib": ARGON2_MEMORY_COST_KIB,
+            "parallelism": ARGON2_PARALLELISM,
+        }
+    else:
+        params = {"rounds": BCRYPT_ROUNDS}
+    return {"scheme": PASSWORD_HASH_SCHEME, "budget_ms": PASSWORD_HASH_BUDGET_MS, **params}
+
+
+def time_hash(context: CryptContext, samples: int = SAMPLES) -> float:
+    """Median milliseconds to hash one password with ``context``"""
+    password = secrets.token_urlsafe(12)
+    context.hash(password)  # loads the backend outside the timing
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash(password)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(budget_ms: float) -> Dict[str, Any]:
+    """Most rounds whose hash fits the budget; each round doubles the work"""
+    best: Optional[Dict[str, Any]] = None
+    for rounds in range(BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS + 1):
+        ms = time_hash(build_context("bcrypt", bcrypt_rounds=rounds))
+        if ms > budget_ms:
+            break
+        best = {"BCRYPT_ROUNDS": rounds, "ms": ms}
+    return best or {"BCRYPT_ROUNDS": BCRYPT_MIN_ROUNDS, "ms": ms}
+
+
+def calibrate_argon2(budget_ms: float, memory_kib: int, parallelism: int) -> Dict[str, Any]:
+    """Most passes at ``memory_kib`` that fit the budget.
+
+    Memory is what makes Argon2 expensive to attack, so it is only lowered,
+    by halving towards ``ARGON2_MIN_MEMORY_KIB``, when even one pass is over
+    budget.
+    """
+    while True:
+        best: Optional[Dict[str, Any]] = None
+        for time_cost in range(1, ARGON2_MAX_TIME_COST + 1):
+            ms = time_hash(build_context(
+                "argon2",
+                argon2_time_cost=time_cost,
+                argon2_memory_kib=memory_kib,
+                argon2_parallelism=parallelism,
+            ))
+            if ms > budget_ms:
+                break
+            best = {"ARGON2_TIME_COST": time_cost, "ms": ms}
+        if best is not None or memory_kib <= ARGON2_MIN_MEMORY_KIB:
+            break
+        memory_kib = max(ARGON2_MIN_MEMORY_KIB, memory_kib // 2)
+
+    best = best or {"ARGON2_TIME_COST": 1, "ms": ms}
+    best.update(ARGON2_MEMORY_COST_KIB=memory_kib, ARGON2_PARALLELISM=parallelism)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick password hash parameters for this machine")
+    parser.add_argument("command", choices=["calibrate"])
+    parser.add_argument("--scheme", choices=SCHEMES, default=PASSWORD_HASH_SCHEME)
+    parser.add_argument("--budget-ms", type=float, default=PASSWORD_HASH_BUDGET_MS)
+    parser.add_argument("--memory-kib", type=int, default=ARGON2_MEMORY_COST_KIB,
+                        help="Argon2 memory to start from")
+    parser.add_argument("--parallelism", type=int, default=ARGON2_PARALLELISM)
+    args = parser.parse_args()
+
+    if args.scheme == "argon2":
+        result = calibrate_argon2(args.budget_ms, args.memory_kib, args.parallelism)
+    else:
+        result = calibrate_bcrypt(args.budget_ms)
+
+    ms = result.pop("ms")
+    if ms > args.budget_ms:
+        print(f"# Even the cheapest allowed parameters take {ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    workers = HASH_POOL_WORKERS or os.cpu_count() or 1
+    print(f"# {ms:.0f} ms per hash; about {workers * 1000 / ms:.0f} sign-ins/s with {workers} hashing workers")
+    print(f"PASSWORD_HASH_SCHEME={args.scheme}")
+    for name, value in result.items():
+        print(f"{name}={value}")
+
+
+if __name__ == "__main__":
+    main()
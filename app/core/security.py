@@ -1,10 +1,31 @@
-from passlib.context import CryptContext
-from jose import jwt
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from jose import JWTError, jwt
 from datetime import datetime, timedelta
 import datetime as dt
-from .config import SECRET_KEY, ALGORITHM
+from .config import (
+    ALGORITHM,
+    JWT_ISSUER,
+    HASH_POOL_WORKERS,
+    HASH_POOL_MAX_QUEUE,
+    JWT_CLAIMS_CACHE_MAX_ENTRIES,
+)
+from .keys import signing_keys
+from .passwords import pwd_context
+from .workers import BoundedProcessPool
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+hashing_pool = BoundedProcessPool(
+    "password_hash",
+    max_workers=HASH_POOL_WORKERS or None,
+    max_queue=HASH_POOL_MAX_QUEUE,
+)
+
+def load_hash_backend():
+    """Import and self-test the hash backend now rather than on the first sign-in"""
+    pwd_context.handler().get_backend()
 
 def verify_password(plain,hashed):
     return pwd_context.verify(plain,hashed)
@@ -12,7 +33,126 @@ def verify_password(plain,hashed):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def create_access_token(subject:str, expires_delta: timedelta):
+def password_needs_update(hashed) -> bool:
+    """True when a stored hash was made with another scheme or other cost parameters.
+
+    Only parses the hash, so it is cheap enough to call on the event loop.
+    """
+    return pwd_context.needs_update(hashed)
+
+async def verify_password_async(plain, hashed):
+    """Verify a password in the hashing pool so hashing never blocks the event loop"""
+    return await hashing_pool.run(verify_password, plain, hashed)
+
+async def get_password_hash_async(password):
+    """Hash a password in the hashing pool so hashing never blocks the event loop"""
+    return await hashing_pool.run(get_password_hash, password)
+
+def create_access_token(subject:str, expires_delta: timedelta, session_epoch: int = 0):
+    """ES256 JWT with a unique ``jti`` and the user's current session epoch (``sev``).
+
+    Signed with the newest key in the key ring; the ``kid`` header tells
+    verifiers which key from /.well-known/jwks.json to check it with.
+    """
     now = datetime.now(dt.timezone.utc)
-    to_encode = {"sub": subject, "iat": now, "exp": now + expires_delta}
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
\ No newline at end of file
+    to_encode = {
+        "iss": JWT_ISSUER,
+        "sub": subject,
+        "iat": now,
+        "exp": now + expires_delta,
+        "jti": secrets.token_urlsafe(16),
+        "sev": session_epoch,
+    }
+    kid, key = signing_keys.signing_key()
+    return jwt.encode(to_encode, key, algorithm=ALGORITHM, headers={"kid": kid})
+
+def new_refresh_token() -> Tuple[str, str]:
+    """An opaque refresh token and the hash it is stored under"""
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+def revocation_id(token: str, claims: Dict[str, Any]) -> str:
+    """Key a token is revoked under: its jti, or for tokens issued without one its SHA-256"""
+    return claims.get("jti") or token_digest(token).hex()
+
+def session_is_current(claims: Dict[str, Any], session_epoch: int) -> bool:
+    """False once the user's sessions were revoked after this token was issued"""
+    return claims.get("sev", 0) == session_epoch
+
+class VerifiedClaimsCache:
+    """Claims of tokens whose signature has already been verified.
+
+    Keyed by token digest; each entry lives until the token's own ``exp``, so
+    a hit can never outlive the token. LRU eviction keeps the size bounded.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: bytes) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        exp, claims = entry
+        if exp <= time.time():
+            del self._entries[digest]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return claims
+
+    def put(self, digest: bytes, claims: Dict[str, Any]):
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        self._entries[digest] = (exp, claims)
+        self._entries.move_to_end(digest)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, digest: bytes):
+        self._entries.pop(digest, None)
+
+    def discard_all(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+claims_cache = VerifiedClaimsCache(JWT_CLAIMS_CACHE_MAX_ENTRIES)
+
+def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verify a JWT and return its claims, or None if it is invalid or expired"""
+    digest = token_digest(token)
+    claims = claims_cache.get(digest)
+    if claims is not None:
+        return claims
+
+    try:
+        key = signing_keys.verification_key(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            return None
+        claims = jwt.decode(token, key, algorithms=[ALGORITHM], issuer=JWT_ISSUER)
+    except JWTError:
+        return None
+
+    claims_cache.put(digest, claims)
+    return claims
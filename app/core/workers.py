@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.metrics import POOL_TASK_SECONDS, POOL_WAIT_SECONDS
+from app.utils.exceptions import ServiceOverloaded
+
+
+def _timed_call(fn: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """Runs in the worker: the result plus the time spent computing it"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class BoundedProcessPool:
+    """Process pool for CPU-bound work with a bounded backlog.
+
+    At most ``max_workers + max_queue`` calls may be pending at once; anything
+    beyond that is rejected immediately with a 503 instead of piling up behind
+    the workers.
+    """
+
+    def __init__(self, name: str, max_workers: Optional[int] = None, max_queue: int = 64):
+        self.name = name
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._task_seconds = POOL_TASK_SECONDS.labels(name)
+        self._wait_seconds = POOL_WAIT_SECONDS.labels(name)
+
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a free worker"""
+        return max(0, self.pending - self.max_workers)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` in a worker process, or raise ServiceOverloaded"""
+        if self.pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ServiceOverloaded()
+
+        self.pending += 1
+        self.submitted += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, busy = await loop.run_in_executor(self._get_executor(), _timed_call, fn, *args)
+        except BrokenProcessPool:
+            # A worker died; drop the executor so the next call starts fresh
+            self.failed += 1
+            self._executor = None
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+        elapsed = time.perf_counter() - start
+        self._task_seconds.observe(busy)
+        self._wait_seconds.observe(max(0.0, elapsed - busy))
+        self.completed += 1
+        self.total_seconds += elapsed
+        if elapsed > self.max_seconds:
+            self.max_seconds = elapsed
+        return result
+
+    async def warm_up(self, fn: Callable[[], Any]):
+        """Start the worker processes now, each running ``fn`` once, instead of on the first calls"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*[loop.run_in_executor(executor, fn) for _ in range(self.max_workers)])
+
+    def stats(self) -> Dict[str, Any]:
+        avg = self.total_seconds / self.completed if self.completed else 0.0
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.pending,
+            "queue_depth": self.queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_latency_ms": round(avg * 1000, 2),
+            "max_latency_ms": round(self.max_seconds * 1000, 2),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,31 +1,45 @@
-import os
-from supabase import create_client, Client
-from typing import Optional
+import logging
+import time
 
-SUPABASE_URL = os.getenv("SUPABASE_URL", "your-supabase-url")
-SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY", "your-supabase-anon-key")
+from supabase import Client
 
-def init_db():
+from app.core.config import READY_CHECK_CACHE_SECONDS
+from app.db.supabase_client import get_supabase, get_async_db
+
+logger = logging.getLogger(__name__)
+
+_last_check = (0.0, False)
+
+async def check_db(max_age: float = READY_CHECK_CACHE_SECONDS) -> bool:
     """
-    Initialize database connection and verify table exists.
+    Verify Supabase is reachable and the users table exists.
     Note: Table should be created via Supabase dashboard or SQL editor.
+    One cheap read on the pooled client; the answer is reused for ``max_age``
+    seconds so frequent readiness probes do not each cost a round trip.
     """
+    global _last_check
+    checked_at, ok = _last_check
+    now = time.monotonic()
+    if now - checked_at < max_age:
+        return ok
+
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("users").select("count", count="exact").limit(1).execute()
-        print(f"✅ Supabase connection successful. Users table exists.")
-        return True
+        await get_async_db().table("users").select("id").limit(1).execute()
+        ok = True
     except Exception as e:
-        print(f"❌ Supabase connection failed: {e}")
-        print("Make sure to:")
-        print("1. Set SUPABASE_URL and SUPABASE_ANON_KEY environment variables")
-        print("2. Create the 'users' table in your Supabase dashboard")
-        return False
+        logger.error(
+            "Supabase connection failed: %s. Make sure to: "
+            "1. Set SUPABASE_URL and SUPABASE_ANON_KEY environment variables; "
+            "2. Create the 'users' table in your Supabase dashboard", e,
+        )
+        ok = False
+    _last_check = (now, ok)
+    return ok
 
 def get_supabase_client() -> Client:
-    """Get Supabase client instance"""
-    return create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+    """Get the shared Supabase client instance"""
+    return get_supabase()
 
 def get_connection():
     """Legacy function name - returns Supabase client instead of SQLite connection"""
-    return get_supabase_client()
\ No newline at end of file
+    return get_supabase_client()
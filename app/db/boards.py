@@ -0,0 +1,299 @@
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from postgrest.exceptions import APIError
+
+from app.core.config import RANK_REBALANCE_LENGTH, BOARD_OWNER_CACHE_MAX_ENTRIES
+from app.db.supabase_client import get_async_db
+from app.core.metrics import timed_execute
+from app.services.jobs import job_queue
+from app.utils.exceptions import MissingReference
+from app.utils.ranking import rank_between, spread_ranks, needs_rebalance
+
+logger = logging.getLogger(__name__)
+
+REBALANCE_RANKS_JOB = "rebalance_ranks"
+# A rebalance whose list changed size meanwhile is retried this many times
+# before the job is left to its normal backoff
+REBALANCE_ATTEMPTS = 3
+
+# Ranked tables and the column that scopes their ordering
+RANK_SCOPES = {"board_columns": "board_id", "cards": "column_id"}
+
+BOARD_SELECT = "id, owner_id, name, created_at"
+COLUMN_SELECT = "id, name, rank"
+CARD_SELECT = "id, column_id, title, description, rank"
+
+# Whole board in one request: columns and their cards are embedded and
+# sorted by rank on the database side
+BOARD_DETAIL_SELECT = f"{BOARD_SELECT}, columns:board_columns({COLUMN_SELECT}, cards({CARD_SELECT}))"
+
+FOREIGN_KEY_VIOLATION = "23503"
+
+# A board's owner never changes, so ownership checks on every drag-and-drop
+# are answered from memory after the first one
+_board_owners: "OrderedDict[str, str]" = OrderedDict()
+
+def _remember_owner(board_id: str, owner_id: str):
+    _board_owners[board_id] = owner_id
+    _board_owners.move_to_end(board_id)
+    if len(_board_owners) > BOARD_OWNER_CACHE_MAX_ENTRIES:
+        _board_owners.popitem(last=False)
+
+async def get_board_owner(board_id: str) -> Optional[str]:
+    """Get the owner of a board, or None if it does not exist"""
+    owner_id = _board_owners.get(board_id)
+    if owner_id is not None:
+        _board_owners.move_to_end(board_id)
+        return owner_id
+
+    try:
+        response = await timed_execute("get_board_owner", get_async_db().table("boards").select("owner_id").eq("id", board_id))
+        if response.data:
+            owner_id = response.data[0]["owner_id"]
+            _remember_owner(board_id, owner_id)
+            return owner_id
+        return None
+    except APIError as e:
+        logger.error("Error getting board owner: %s", e)
+        return None
+
+async def list_boards(owner_id: str) -> List[Dict[str, Any]]:
+    """Get every board a user owns, newest first"""
+    try:
+        query = get_async_db().table("boards")\
+            .select(BOARD_SELECT)\
+            .eq("owner_id", owner_id)\
+            .order("created_at", desc=True)
+        response = await timed_execute("list_boards", query)
+        for board in response.data:
+            _remember_owner(board["id"], owner_id)
+        return response.data
+    except APIError as e:
+        logger.error("Error listing boards: %s", e)
+        return []
+
+async def load_board(board_id: str) -> Optional[Dict[str, Any]]:
+    """Get a board with its columns and cards, already in rank order"""
+    try:
+        query = get_async_db().table("boards")\
+            .select(BOARD_DETAIL_SELECT)\
+            .eq("id", board_id)\
+            .order("rank", foreign_table="columns")\
+            .order("rank", foreign_table="columns.cards")
+        response = await timed_execute("load_board", query)
+        if response.data:
+            return response.data[0]
+        return None
+    except APIError as e:
+        logger.error("Error loading board: %s", e)
+        return None
+
+async def create_board(owner_id: str, name: str) -> Optional[Dict[str, Any]]:
+    """Create an empty board"""
+    try:
+        board = {"id": str(uuid.uuid4()), "owner_id": owner_id, "name": name}
+        response = await timed_execute("create_board", get_async_db().table("boards").insert(board))
+        if response.data:
+            _remember_owner(board["id"], owner_id)
+            return response.data[0]
+        return None
+    except APIError as e:
+        logger.error("Error creating board: %s", e)
+        return None
+
+async def delete_board(board_id: str) -> bool:
+    """Delete a board; its columns and cards go with it"""
+    try:
+        response = await timed_execute("delete_board", get_async_db().table("boards").delete().eq("id", board_id))
+        _board_owners.pop(board_id, None)
+        return len(response.data) > 0
+    except APIError as e:
+        logger.error("Error deleting board: %s", e)
+        return False
+
+async def _last_rank(table: str, scope_id: str) -> Optional[str]:
+    query = get_async_db().table(table)\
+        .select("rank")\
+        .eq(RANK_SCOPES[table], scope_id)\
+        .order("rank", desc=True)\
+        .limit(1)
+    response = await timed_execute("last_rank", query)
+    return response.data[0]["rank"] if response.data else None
+
+async def _schedule_rebalance_if_needed(table: str, scope_id: str, rank: str):
+    if needs_rebalance(rank, RANK_REBALANCE_LENGTH):
+        await job_queue.enqueue(REBALANCE_RANKS_JOB, {"table": table, "scope_id": scope_id})
+
+def _raise_missing_reference(error: APIError, field: str):
+    if error.code == FOREIGN_KEY_VIOLATION:
+        raise MissingReference(field) from error
+
+async def create_column(board_id: str, name: str) -> Optional[Dict[str, Any]]:
+    """Append a column to the end of a board"""
+    try:
+        rank = rank_between(await _last_rank("board_columns", board_id), None)
+        column = {"id": str(uuid.uuid4()), "board_id": board_id, "name": name, "rank": rank}
+        response = await timed_execute("create_column", get_async_db().table("board_columns").insert(column))
+        if response.data:
+            await _schedule_rebalance_if_needed("board_columns", board_id, rank)
+            return response.data[0]
+        return None
+    except APIError as e:
+        logger.error("Error creating column: %s", e)
+        return None
+
+async def rename_column(board_id: str, column_id: str, name: str) -> Optional[Dict[str, Any]]:
+    """Rename a column"""
+    try:
+        query = get_async_db().table("board_columns")\
+            .update({"name": name})\
+            .eq("id", column_id)\
+            .eq("board_id", board_id)
+        response = await timed_execute("rename_column", query)
+        return response.data[0] if response.data else None
+    except APIError as e:
+        logger.error("Error renaming column: %s", e)
+        return None
+
+async def move_column(
+    board_id: str, column_id: str, prev_rank: Optional[str], next_rank: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """Move a column between two neighbours by rewriting only its own rank.
+
+    Raises ValueError if the neighbour ranks are not in order.
+    """
+    rank = rank_between(prev_rank, next_rank)
+    try:
+        query = get_async_db().table("board_columns")\
+            .update({"rank": rank})\
+            .eq("id", column_id)\
+            .eq("board_id", board_id)
+        response = await timed_execute("move_column", query)
+        if response.data:
+            await _schedule_rebalance_if_needed("board_columns", board_id, rank)
+            return response.data[0]
+        return None
+    except APIError as e:
+        logger.error("Error moving column: %s", e)
+        return None
+
+async def delete_column(board_id: str, column_id: str) -> bool:
+    """Delete a column and its cards"""
+    try:
+        query = get_async_db().table("board_columns")\
+            .delete()\
+            .eq("id", column_id)\
+            .eq("board_id", board_id)
+        response = await timed_execute("delete_column", query)
+        return len(response.data) > 0
+    except APIError as e:
+        logger.error("Error deleting column: %s", e)
+        return False
+
+async def create_card(
+    board_id: str, column_id: str, title: str, description: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """Append a card to the end of a column.
+
+    Raises MissingReference if the column is not on this board.
+    """
+    try:
+        rank = rank_between(await _last_rank("cards", column_id), None)
+        card = {
+            "id": str(uuid.uuid4()),
+            "board_id": board_id,
+            "column_id": column_id,
+            "title": title,
+            "description": description,
+            "rank": rank,
+        }
+        response = await timed_execute("create_card", get_async_db().table("cards").insert(card))
+        if response.data:
+            await _schedule_rebalance_if_needed("cards", column_id, rank)
+            return response.data[0]
+        return None
+    except APIError as e:
+        _raise_missing_reference(e, "column")
+        logger.error("Error creating card: %s", e)
+        return None
+
+async def update_card(board_id: str, card_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Update a card's title or description"""
+    try:
+        query = get_async_db().table("cards")\
+            .update(update_data)\
+            .eq("id", card_id)\
+            .eq("board_id", board_id)
+        response = await timed_execute("update_card", query)
+        return response.data[0] if response.data else None
+    except APIError as e:
+        logger.error("Error updating card: %s", e)
+        return None
+
+async def move_card(
+    board_id: str, card_id: str, column_id: str, prev_rank: Optional[str], next_rank: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """Move a card within or between columns with a single-row update.
+
+    The caller passes the ranks of the cards it is dropped between, as seen
+    in the board it loaded, so no other row is read or renumbered. Raises
+    ValueError if the ranks are not in order, and MissingReference if the
+    target column is not on this board.
+    """
+    rank = rank_between(prev_rank, next_rank)
+    try:
+        query = get_async_db().table("cards")\
+            .update({"column_id": column_id, "rank": rank})\
+            .eq("id", card_id)\
+            .eq("board_id", board_id)
+        response = await timed_execute("move_card", query)
+        if response.data:
+            await _schedule_rebalance_if_needed("cards", column_id, rank)
+            return response.data[0]
+        return None
+    except APIError as e:
+        _raise_missing_reference(e, "column")
+        logger.error("Error moving card: %s", e)
+        return None
+
+async def delete_card(board_id: str, card_id: str) -> bool:
+    """Delete a card"""
+    try:
+        query = get_async_db().table("cards")\
+            .delete()\
+            .eq("id", card_id)\
+            .eq("board_id", board_id)
+        response = await timed_execute("delete_card", query)
+        return len(response.data) > 0
+    except APIError as e:
+        logger.error("Error deleting card: %s", e)
+        return False
+
+async def _rebalance(table: str, scope_id: str):
+    """Respace every rank in one list, atomically, with respace_ranks (app/db/boards.sql).
+
+    The ranks are generated here for the list's current size; if rows were
+    added or removed before the function ran, it changes nothing and the
+    list is counted again.
+    """
+    for _ in range(REBALANCE_ATTEMPTS):
+        query = get_async_db().table(table).select("id").eq(RANK_SCOPES[table], scope_id)
+        count = len((await timed_execute("rebalance_ranks_count", query)).data)
+        query = get_async_db().rpc("respace_ranks", {
+            "list_table": table,
+            "list_id": scope_id,
+            "new_ranks": spread_ranks(count),
+        })
+        if (await timed_execute("rebalance_ranks", query)).data != -1:
+            return
+    raise RuntimeError(f"{table} list {scope_id} kept changing size during rebalance")
+
+async def _rebalance_ranks_job(payloads: List[Dict[str, str]]):
+    """Job handler: respace each distinct list once, however many moves asked for it"""
+    scopes = dict.fromkeys((payload["table"], payload["scope_id"]) for payload in payloads)
+    for table, scope_id in scopes:
+        await _rebalance(table, scope_id)
+
+job_queue.register(REBALANCE_RANKS_JOB, _rebalance_ranks_job)
@@ -0,0 +1,70 @@
+-- Tables behind app/db/boards.py. Run once in the Supabase SQL editor.
+--
+-- Ranks are compared byte-wise (COLLATE "C") so that string order matches
+-- the order app/utils/ranking.py generates. Cards reference their column
+-- together with its board, so a card can never be moved onto another board.
+
+CREATE TABLE IF NOT EXISTS boards (
+    id text PRIMARY KEY,
+    owner_id text NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    name text NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS boards_owner ON boards (owner_id, created_at);
+
+CREATE TABLE IF NOT EXISTS board_columns (
+    id text PRIMARY KEY,
+    board_id text NOT NULL REFERENCES boards (id) ON DELETE CASCADE,
+    name text NOT NULL,
+    rank text COLLATE "C" NOT NULL,
+    UNIQUE (id, board_id)
+);
+CREATE INDEX IF NOT EXISTS board_columns_rank ON board_columns (board_id, rank);
+
+CREATE TABLE IF NOT EXISTS cards (
+    id text PRIMARY KEY,
+    board_id text NOT NULL,
+    column_id text NOT NULL,
+    title text NOT NULL,
+    description text,
+    rank text COLLATE "C" NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    FOREIGN KEY (column_id, board_id) REFERENCES board_columns (id, board_id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS cards_rank ON cards (column_id, rank);
+CREATE INDEX IF NOT EXISTS cards_board ON cards (board_id);
+
+-- Respace one ranked list (a board's columns or a column's cards) in a
+-- single transaction. The list's rows are locked and renumbered in their
+-- current order by one UPDATE, so the list is either fully respaced or left
+-- untouched, and concurrent moves land either before or after it.
+-- new_ranks holds one rank per row, in order. Returns the rows changed, or
+-- -1 when the list no longer has that many rows.
+CREATE OR REPLACE FUNCTION respace_ranks(list_table text, list_id text, new_ranks text[])
+RETURNS integer AS $$
+DECLARE
+    scope_column text;
+    row_count integer;
+    changed integer;
+BEGIN
+    scope_column := CASE list_table WHEN 'board_columns' THEN 'board_id' WHEN 'cards' THEN 'column_id' END;
+    IF scope_column IS NULL THEN
+        RAISE EXCEPTION 'Not a ranked table: %', list_table;
+    END IF;
+
+    EXECUTE format('SELECT count(*) FROM (SELECT 1 FROM %I WHERE %I = $1 FOR UPDATE) locked', list_table, scope_column)
+    INTO row_count USING list_id;
+    IF row_count <> coalesce(array_length(new_ranks, 1), 0) THEN
+        RETURN -1;
+    END IF;
+
+    EXECUTE format(
+        'UPDATE %1$I t SET rank = $2[o.pos]
+         FROM (SELECT id, row_number() OVER (ORDER BY rank, id) AS pos FROM %1$I WHERE %2$I = $1) o
+         WHERE t.id = o.id AND t.rank IS DISTINCT FROM $2[o.pos]',
+        list_table, scope_column
+    ) USING list_id, new_ranks;
+    GET DIAGNOSTICS changed = ROW_COUNT;
+    RETURN changed;
+END;
+$$ LANGUAGE plpgsql;
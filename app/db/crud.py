@@ -1,48 +1,158 @@
+import asyncio
+import logging
 import uuid
-from typing import Optional, Dict, Any
-from app.db.supabase_client import supabase
-from app.core.security import get_password_hash
+from typing import Optional, Dict, Any, List, Tuple
+from app.db.supabase_client import get_async_db
+from app.core.metrics import timed_execute
+from app.db.user_cache import user_cache
+from app.db.user_replica import user_replica
+from app.utils.singleflight import SingleFlight
+from app.models.user import UserRecord, USER_AUTH_COLUMNS, USER_PUBLIC_COLUMNS, USER_FULL_COLUMNS
+from app.core.security import get_password_hash_async
+from app.utils.exceptions import UniqueViolation, DataUnavailable
 from postgrest.exceptions import APIError
 from datetime import datetime, timedelta
 import datetime as dt
 
-def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
-    """Get user by email from Supabase"""
-    try:
-        response = supabase.table("users").select("*").eq("email", email).execute()
-        if response.data:
-            return response.data[0]
+logger = logging.getLogger(__name__)
+
+AUTH_SELECT = ", ".join(USER_AUTH_COLUMNS)
+PUBLIC_SELECT = ", ".join(USER_PUBLIC_COLUMNS)
+FULL_SELECT = ", ".join(USER_FULL_COLUMNS)
+
+# The ids of an in_ filter travel in the URL; 100 UUIDs keep it near 4KB,
+# well inside the 8KB request-line limit common to proxies
+USER_IDS_PER_QUERY = 100
+
+# Concurrent identical reads, e.g. a board's parallel requests all resolving
+# the same bearer token, share one round trip
+read_flights = SingleFlight("supabase_reads")
+
+async def _fetch_user(call: str, column: str, value: str, columns: str, cache: bool) -> Optional[UserRecord]:
+    generation = user_cache.generation
+    response = await timed_execute(call, get_async_db().table("users").select(columns).eq(column, value))
+    if not response.data:
         return None
+    user = UserRecord.from_row(response.data[0])
+    if cache:
+        user_cache.put(user, generation)
+        if generation == user_cache.generation:
+            await user_replica.put(response.data[0])
+    return user
+
+def _from_replica(user: Optional[UserRecord], generation: int) -> Optional[UserRecord]:
+    if user is not None:
+        user_cache.put(user, generation)
+    return user
+
+async def get_user_by_email(email: str) -> Optional[UserRecord]:
+    """Get the auth view of a user by email, from the user cache when possible"""
+    cached = user_cache.get_by_email(email)
+    if cached is not None:
+        return cached
+
+    replicated = _from_replica(user_replica.get_by_email(email), user_cache.generation)
+    if replicated is not None:
+        return replicated
+
+    try:
+        return await read_flights.do(("user_by_email", email), _fetch_user, "get_user_by_email", "email", email, AUTH_SELECT, True)
     except APIError as e:
-        print(f"Error getting user by email: {e}")
+        logger.error("Error getting user by email: %s", e)
         return None
 
-def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
-    """Get user by username from Supabase"""
+async def get_user_credentials_by_email(email: str) -> Optional[UserRecord]:
+    """Get the full view of a user, password hash included; never cached"""
     try:
-        response = supabase.table("users").select("*").eq("username", username).execute()
-        if response.data:
-            return response.data[0]
-        return None
+        return await read_flights.do(("user_credentials", email), _fetch_user, "get_user_credentials_by_email", "email", email, FULL_SELECT, False)
     except APIError as e:
-        print(f"Error getting user by username: {e}")
+        logger.error("Error getting user credentials: %s", e)
         return None
 
-def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
-    """Get user by ID from Supabase"""
+async def get_user_by_username(username: str) -> Optional[UserRecord]:
+    """Get the auth view of a user by username from Supabase"""
     try:
-        response = supabase.table("users").select("*").eq("id", user_id).execute()
-        if response.data:
-            return response.data[0]
+        return await read_flights.do(("user_by_username", username), _fetch_user, "get_user_by_username", "username", username, AUTH_SELECT, False)
+    except APIError as e:
+        logger.error("Error getting user by username: %s", e)
         return None
+
+async def get_user_by_id(user_id: str) -> Optional[UserRecord]:
+    """Get the auth view of a user by ID, from the user cache when possible"""
+    cached = user_cache.get_by_id(user_id)
+    if cached is not None:
+        return cached
+
+    replicated = _from_replica(user_replica.get_by_id(user_id), user_cache.generation)
+    if replicated is not None:
+        return replicated
+
+    try:
+        return await read_flights.do(("user_by_id", user_id), _fetch_user, "get_user_by_id", "id", user_id, AUTH_SELECT, True)
     except APIError as e:
-        print(f"Error getting user by ID: {e}")
+        logger.error("Error getting user by ID: %s", e)
+        return None
+
+async def _fetch_public_users(user_ids: List[str]) -> List[UserRecord]:
+    response = await timed_execute("get_users_by_ids", get_async_db().table("users").select(PUBLIC_SELECT).in_("id", user_ids))
+    return [UserRecord.from_row(row) for row in response.data]
+
+async def get_users_by_ids(user_ids: List[str]) -> List[UserRecord]:
+    """Get the public view of many users in as few round trips as the URL length allows.
+
+    Cached records are used as they are. The rest are fetched with the public
+    projection, USER_IDS_PER_QUERY at a time and concurrently, and not cached,
+    since they lack the email the cache is keyed by. Raises DataUnavailable
+    if any query fails, rather than answer with only some of the users.
+    """
+    users, missing = [], []
+    for user_id in dict.fromkeys(user_ids):
+        cached = user_cache.get_by_id(user_id)
+        if cached is not None:
+            users.append(cached)
+        else:
+            missing.append(user_id)
+
+    if not missing:
+        return users
+
+    chunks = await asyncio.gather(*[
+        _fetch_public_users(missing[start:start + USER_IDS_PER_QUERY])
+        for start in range(0, len(missing), USER_IDS_PER_QUERY)
+    ], return_exceptions=True)
+    failed = False
+    for chunk in chunks:
+        if isinstance(chunk, APIError):
+            logger.error("Error getting users by IDs: %s", chunk)
+            failed = True
+        elif isinstance(chunk, BaseException):
+            raise chunk
+        else:
+            users.extend(chunk)
+    if failed:
+        raise DataUnavailable()
+    return users
+
+UNIQUE_VIOLATION = "23505"
+
+def _unique_violation_field(error: APIError) -> Optional[str]:
+    """Map a Postgres unique-violation error to the users column it hit"""
+    if error.code != UNIQUE_VIOLATION:
         return None
+    text = f"{error.message or ''} {error.details or ''}"
+    for field in ("email", "username"):
+        if f"users_{field}_key" in text or f"({field})" in text:
+            return field
+    return None
+
+async def create_user(username: str, email: str, password: str) -> Optional[str]:
+    """Create a new user in Supabase.
 
-def create_user(username: str, email: str, password: str) -> Optional[str]:
-    """Create a new user in Supabase"""
+    Relies on the unique constraints on email and username instead of checking
+    first, and raises UniqueViolation naming the column that clashed.
+    """
     try:
-        hashed = get_password_hash(password)
+        hashed = await get_password_hash_async(password)
         user_id = str(uuid.uuid4())
         
         user_data = {
@@ -52,100 +162,269 @@ def create_user(username: str, email: str, password: str) -> Optional[str]:
             "hashed_password": hashed
         }
         
-        response = supabase.table("users").insert(user_data).execute()
+        response = await timed_execute("create_user", get_async_db().table("users").insert(user_data))
         
         if response.data:
+            await user_replica.put(response.data[0])
             return user_id
         return None
         
     except APIError as e:
-        print(f"Error creating user: {e}")
+        field = _unique_violation_field(e)
+        if field:
+            raise UniqueViolation(field) from e
+        logger.error("Error creating user: %s", e)
         return None
 
-def update_user(user_id: str, update_data: Dict[str, Any]) -> bool:
+async def update_user(user_id: str, update_data: Dict[str, Any]) -> bool:
     """Update user in Supabase"""
     try:
-        response = supabase.table("users").update(update_data).eq("id", user_id).execute()
+        response = await timed_execute("update_user", get_async_db().table("users").update(update_data).eq("id", user_id))
+        user_cache.invalidate(user_id)
+        await user_replica.apply_update(user_id, update_data)
+        return len(response.data) > 0
+    except APIError as e:
+        logger.error("Error updating user: %s", e)
+        return False
+
+async def replace_password_hash(user_id: str, old_hash: str, new_hash: str) -> bool:
+    """Swap a user's password hash for a rehash of the same password.
+
+    Only applies while the stored hash is still ``old_hash``, so a password
+    change that lands first is never overwritten. Neither the user cache nor
+    the replica holds hashes, so nothing local needs invalidating.
+    """
+    try:
+        query = (
+            get_async_db().table("users")
+            .update({"hashed_password": new_hash})
+            .eq("id", user_id)
+            .eq("hashed_password", old_hash)
+        )
+        response = await timed_execute("replace_password_hash", query)
         return len(response.data) > 0
     except APIError as e:
-        print(f"Error updating user: {e}")
+        logger.error("Error replacing password hash: %s", e)
         return False
 
-def delete_user(user_id: str) -> bool:
+async def delete_user(user_id: str) -> bool:
     """Delete user from Supabase"""
     try:
-        response = supabase.table("users").delete().eq("id", user_id).execute()
+        response = await timed_execute("delete_user", get_async_db().table("users").delete().eq("id", user_id))
+        user_cache.invalidate(user_id)
+        await user_replica.remove(user_id)
         return len(response.data) > 0
     except APIError as e:
-        print(f"Error deleting user: {e}")
+        logger.error("Error deleting user: %s", e)
         return False
-def add_token_to_blacklist(token: str, expires_minutes: int = 30) -> bool:
-    """Add token to blacklist"""
+
+async def add_token_to_blacklist(jti: str, expires_at: datetime) -> bool:
+    """Revoke one token by its jti until the token itself expires"""
     try:
-        expires_at = datetime.now(dt.timezone.utc) + timedelta(minutes=expires_minutes)
-        
         blacklist_data = {
-            "token": token,
+            "jti": jti,
             "expires_at": expires_at.isoformat()
         }
         
-        response = supabase.table("token_blacklist").insert(blacklist_data).execute()
-        return len(response.data) > 0
+        # Revoking the same token twice is not an error
+        query = get_async_db().table("token_blacklist").upsert(blacklist_data, on_conflict="jti", ignore_duplicates=True)
+        await timed_execute("add_token_to_blacklist", query)
+        return True
     except APIError as e:
-        print(f"Error adding token to blacklist: {e}")
+        logger.error("Error adding token to blacklist: %s", e)
         return False
 
-def is_token_blacklisted(token: str) -> bool:
-    """Check if token is blacklisted"""
+async def _fetch_token_blacklisted(jti: str) -> bool:
+    now = datetime.now(dt.timezone.utc).isoformat()
+
+    query = get_async_db().table("token_blacklist")\
+        .select("jti")\
+        .eq("jti", jti)\
+        .gt("expires_at", now)
+    response = await timed_execute("is_token_blacklisted", query)
+
+    return len(response.data) > 0
+
+async def is_token_blacklisted(jti: str) -> bool:
+    """Check if the token with this jti has been revoked"""
+    try:
+        return await read_flights.do(("token_blacklisted", jti), _fetch_token_blacklisted, jti)
+    except APIError as e:
+        logger.error("Error checking token blacklist: %s", e)
+        return False
+
+async def get_blacklisted_tokens_after(after: Optional[Tuple[str, str]], limit: int = 1000) -> Optional[List[Dict[str, Any]]]:
+    """Get unexpired blacklist rows ordered by (created_at, jti), starting after that pair.
+
+    A keyset cursor, so rows sharing one created_at are paged through
+    instead of being skipped.
+    """
     try:
         now = datetime.now(dt.timezone.utc).isoformat()
-        
-        response = supabase.table("token_blacklist")\
-            .select("token")\
-            .eq("token", token)\
+
+        query = get_async_db().table("token_blacklist")\
+            .select("jti, expires_at, created_at")\
             .gt("expires_at", now)\
-            .execute()
-        
+            .not_.is_("jti", "null")
+        if after:
+            created_at, jti = after
+            query = query.or_(f"created_at.gt.{created_at},and(created_at.eq.{created_at},jti.gt.{jti})")
+
+        query = query.order("created_at").order("jti").limit(limit)
+        response = await timed_execute("get_blacklisted_tokens_after", query)
+        return response.data
+    except APIError as e:
+        logger.error("Error fetching blacklisted tokens: %s", e)
+        return None
+
+async def bump_session_epoch(user_id: str) -> Optional[int]:
+    """Revoke every token issued to a user so far; returns the new epoch"""
+    try:
+        response = await timed_execute("bump_session_epoch", get_async_db().rpc("bump_session_epoch", {"target_id": user_id}))
+        if response.data is None:
+            return None
+        epoch = int(response.data)
+        user_cache.invalidate(user_id)
+        await user_replica.apply_update(user_id, {"session_epoch": epoch})
+        return epoch
+    except APIError as e:
+        logger.error("Error bumping session epoch: %s", e)
+        return None
+
+async def create_refresh_token(token_hash: str, family_id: str, user_id: str, session_epoch: int, expires_at: datetime) -> bool:
+    """Store a refresh token's hash"""
+    try:
+        response = await timed_execute("create_refresh_token", get_async_db().table("refresh_tokens").insert({
+            "token_hash": token_hash,
+            "family_id": family_id,
+            "user_id": user_id,
+            "session_epoch": session_epoch,
+            "expires_at": expires_at.isoformat(),
+        }))
         return len(response.data) > 0
     except APIError as e:
-        print(f"Error checking token blacklist: {e}")
+        logger.error("Error creating refresh token: %s", e)
         return False
 
-def cleanup_expired_tokens() -> bool:
-    """Remove expired tokens from blacklist"""
+async def get_refresh_token(token_hash: str) -> Optional[Dict[str, Any]]:
+    """Get a stored refresh token by hash; never cached. Raises DataUnavailable on errors"""
     try:
-        now = datetime.now(dt.timezone.utc).isoformat()
-        
-        response = supabase.table("token_blacklist")\
-            .delete()\
-            .lt("expires_at", now)\
-            .execute()
-        
-        print(f"Cleaned up {len(response.data)} expired tokens")
+        query = get_async_db().table("refresh_tokens")\
+            .select("id, family_id, user_id, session_epoch, expires_at, used_at, revoked_at")\
+            .eq("token_hash", token_hash)
+        response = await timed_execute("get_refresh_token", query)
+        return response.data[0] if response.data else None
+    except APIError as e:
+        logger.error("Error getting refresh token: %s", e)
+        raise DataUnavailable() from e
+
+async def use_refresh_token(token_id: str) -> bool:
+    """Mark a refresh token used; False if it already was (e.g. by a concurrent refresh) or was revoked.
+
+    Raises DataUnavailable on errors, which must not be mistaken for reuse.
+    """
+    try:
+        query = get_async_db().table("refresh_tokens")\
+            .update({"used_at": datetime.now(dt.timezone.utc).isoformat()})\
+            .eq("id", token_id)\
+            .is_("used_at", "null")\
+            .is_("revoked_at", "null")
+        response = await timed_execute("use_refresh_token", query)
+        return len(response.data) > 0
+    except APIError as e:
+        logger.error("Error using refresh token: %s", e)
+        raise DataUnavailable() from e
+
+async def revoke_refresh_family(family_id: str) -> bool:
+    """Revoke every token in a refresh token family, used or not"""
+    try:
+        query = get_async_db().table("refresh_tokens")\
+            .update({"revoked_at": datetime.now(dt.timezone.utc).isoformat()})\
+            .eq("family_id", family_id)\
+            .is_("revoked_at", "null")
+        await timed_execute("revoke_refresh_family", query)
         return True
     except APIError as e:
-        print(f"Error cleaning up expired tokens: {e}")
+        logger.error("Error revoking refresh tokens: %s", e)
+        return False
+
+async def get_user_session(user_id: str) -> Optional[UserRecord]:
+    """Auth view of a user read straight from Supabase, for checks that must not be stale.
+
+    Raises DataUnavailable on errors, so they are not mistaken for a missing user.
+    """
+    try:
+        return await read_flights.do(("user_session", user_id), _fetch_user, "get_user_session", "id", user_id, AUTH_SELECT, False)
+    except APIError as e:
+        logger.error("Error getting user session: %s", e)
+        raise DataUnavailable() from e
+
+async def purge_expired_tokens(batch_size: int) -> Optional[int]:
+    """Delete up to `batch_size` expired blacklist rows; returns how many were removed"""
+    try:
+        query = get_async_db().rpc("purge_expired_tokens", {"batch_size": batch_size})
+        response = await timed_execute("purge_expired_tokens", query)
+        return int(response.data or 0)
+    except APIError as e:
+        logger.error("Error purging expired tokens: %s", e)
+        return None
+
+async def acquire_lease(name: str, holder: str, ttl_seconds: float) -> bool:
+    """Take or extend the named scheduler lease; False while another holder has it"""
+    try:
+        query = get_async_db().rpc("acquire_lease", {
+            "lease_name": name,
+            "lease_holder": holder,
+            "ttl_seconds": ttl_seconds,
+        })
+        response = await timed_execute("acquire_lease", query)
+        return response.data is True
+    except APIError as e:
+        logger.error("Error acquiring lease '%s': %s", name, e)
         return False
     
-def update_user_profile_picture(user_id: str, profile_picture_url: str) -> bool:
+async def update_user_profile_picture(user_id: str, profile_picture_url: str) -> bool:
     """Update user's profile picture URL"""
     try:
-        response = supabase.table("users").update({
+        response = await timed_execute("update_user_profile_picture", get_async_db().table("users").update({
             "profile_picture_url": profile_picture_url
-        }).eq("id", user_id).execute()
+        }).eq("id", user_id))
+        user_cache.invalidate(user_id)
+        await user_replica.apply_update(user_id, {"profile_picture_url": profile_picture_url})
         
         return len(response.data) > 0
     except Exception as e:
-        print(f"Error updating profile picture: {e}")
+        logger.error("Error updating profile picture: %s", e)
         return False
 
-def get_user_profile_picture(user_id: str) -> Optional[str]:
+async def _fetch_profile_picture(user_id: str) -> Optional[str]:
+    response = await timed_execute("get_user_profile_picture", get_async_db().table("users").select("profile_picture_url").eq("id", user_id))
+    if response.data:
+        return response.data[0].get("profile_picture_url")
+    return None
+
+async def get_user_profile_picture(user_id: str) -> Optional[str]:
     """Get user's current profile picture URL"""
+    cached = user_cache.get_by_id(user_id) or user_replica.get_by_id(user_id)
+    if cached is not None:
+        return cached.profile_picture_url
+
     try:
-        response = supabase.table("users").select("profile_picture_url").eq("id", user_id).execute()
-        if response.data:
-            return response.data[0].get("profile_picture_url")
-        return None
+        return await read_flights.do(("profile_picture", user_id), _fetch_profile_picture, user_id)
     except Exception as e:
-        print(f"Error getting profile picture: {e}")
-        return None
\ No newline at end of file
+        logger.error("Error getting profile picture: %s", e)
+        return None
+
+async def get_profile_pictures_in_use(urls: List[str]) -> Optional[List[str]]:
+    """Which of these picture URLs some user row still points at; None on error.
+
+    Read from Supabase, never a local copy, since a stale answer here means
+    deleting a live picture.
+    """
+    try:
+        query = get_async_db().table("users").select("profile_picture_url").in_("profile_picture_url", urls)
+        response = await timed_execute("get_profile_pictures_in_use", query)
+        return [row["profile_picture_url"] for row in response.data]
+    except APIError as e:
+        logger.error("Error checking profile pictures in use: %s", e)
+        return None
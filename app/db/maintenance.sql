@@ -0,0 +1,46 @@
+-- Leases and batched purges for the background maintenance in
+-- app/services/token_cleanup.py. Run once in the Supabase SQL editor.
+
+-- One row per scheduled job: whoever holds an unexpired lease runs it
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name text PRIMARY KEY,
+    holder text NOT NULL,
+    expires_at timestamptz NOT NULL
+);
+
+-- Take the lease if it is free or expired, or extend it if we already hold
+-- it; true when the caller holds it afterwards
+CREATE OR REPLACE FUNCTION acquire_lease(lease_name text, lease_holder text, ttl_seconds double precision)
+RETURNS boolean AS $$
+DECLARE
+    taken boolean;
+BEGIN
+    INSERT INTO scheduler_leases AS l (name, holder, expires_at)
+    VALUES (lease_name, lease_holder, now() + make_interval(secs => ttl_seconds))
+    ON CONFLICT (name) DO UPDATE
+        SET holder = EXCLUDED.holder, expires_at = EXCLUDED.expires_at
+        WHERE l.expires_at <= now() OR l.holder = EXCLUDED.holder
+    RETURNING true INTO taken;
+    RETURN coalesce(taken, false);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE INDEX IF NOT EXISTS token_blacklist_expires_at ON token_blacklist (expires_at);
+
+-- Delete at most batch_size expired rows; returns how many went
+CREATE OR REPLACE FUNCTION purge_expired_tokens(batch_size integer)
+RETURNS integer AS $$
+DECLARE
+    purged integer;
+BEGIN
+    DELETE FROM token_blacklist
+    WHERE ctid IN (
+        SELECT ctid FROM token_blacklist
+        WHERE expires_at < now()
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    );
+    GET DIAGNOSTICS purged = ROW_COUNT;
+    RETURN purged;
+END;
+$$ LANGUAGE plpgsql;
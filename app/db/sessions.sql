@@ -0,0 +1,44 @@
+-- Session epochs and compact token revocation. Run once in the Supabase
+-- SQL editor.
+
+-- Access tokens carry the epoch they were issued under; bumping it
+-- revokes all of a user's sessions at once
+ALTER TABLE users ADD COLUMN IF NOT EXISTS session_epoch integer NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION bump_session_epoch(target_id users.id%TYPE)
+RETURNS integer AS $$
+    UPDATE users SET session_epoch = session_epoch + 1
+    WHERE id = target_id
+    RETURNING session_epoch;
+$$ LANGUAGE sql;
+
+-- Single-token revocations store the token's jti instead of the whole JWT.
+-- Rows written before this change are keyed by the hex SHA-256 of the
+-- token, which is what the API falls back to for tokens without a jti.
+ALTER TABLE token_blacklist ADD COLUMN IF NOT EXISTS jti text;
+UPDATE token_blacklist SET jti = encode(sha256(convert_to(token, 'UTF8')), 'hex') WHERE jti IS NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS token_blacklist_jti ON token_blacklist (jti);
+-- The API's in-process blacklist syncs from this, paging by (created_at, jti)
+ALTER TABLE token_blacklist ADD COLUMN IF NOT EXISTS created_at timestamptz NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS token_blacklist_created_at_jti ON token_blacklist (created_at, jti);
+-- No longer written; drop it once no older release is running
+ALTER TABLE token_blacklist ALTER COLUMN token DROP NOT NULL;
+
+-- Rotating refresh tokens. Only a SHA-256 of each token is stored; every
+-- refresh marks the presented token used and issues the next one in the
+-- same family, and presenting a used token revokes the whole family.
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    token_hash text NOT NULL UNIQUE,
+    family_id uuid NOT NULL,
+    user_id users.id%TYPE NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    session_epoch integer NOT NULL,
+    expires_at timestamptz NOT NULL,
+    used_at timestamptz,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+-- Set on every token of a family when it is revoked, kept apart from
+-- used_at so a revoked token never passes as a recently used one
+ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS revoked_at timestamptz;
+CREATE INDEX IF NOT EXISTS refresh_tokens_family ON refresh_tokens (family_id);
+CREATE INDEX IF NOT EXISTS refresh_tokens_expires_at ON refresh_tokens (expires_at);
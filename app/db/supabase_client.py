@@ -1,14 +1,32 @@
+import asyncio
+import logging
 import os
+import httpx
+from urllib.parse import urlparse
 from supabase import create_client, Client
+from postgrest import AsyncPostgrestClient
 from typing import Optional
 
 from dotenv import load_dotenv
 load_dotenv()
 
+from app.core.config import (
+    SUPABASE_POOL_MAX_CONNECTIONS,
+    SUPABASE_POOL_MAX_KEEPALIVE,
+    SUPABASE_POOL_KEEPALIVE_EXPIRY,
+    SUPABASE_CONNECT_TIMEOUT,
+    SUPABASE_READ_TIMEOUT,
+    SUPABASE_POOL_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
 def validate_supabase_config():
     """Validate Supabase configuration"""
     if not SUPABASE_URL:
@@ -29,7 +47,8 @@ def validate_supabase_config():
             "Please replace with your actual Supabase project URL from the dashboard."
         )
     
-    if not SUPABASE_URL.startswith("https://"):
+    # Plain http is only accepted for a local stand-in such as benchmarks/fake_supabase.py
+    if not SUPABASE_URL.startswith("https://") and urlparse(SUPABASE_URL).hostname not in LOCAL_HOSTS:
         raise ValueError(
             f"SUPABASE_URL must start with 'https://'. Got: {SUPABASE_URL}"
         )
@@ -37,11 +56,11 @@ def validate_supabase_config():
 def validate_service_role_config():
     """Validate service role configuration for admin operations"""
     if not SUPABASE_SERVICE_ROLE_KEY:
-        print("⚠️  SUPABASE_SERVICE_ROLE_KEY not found. Admin operations (like file uploads) may fail due to RLS policies.")
+        logger.warning("SUPABASE_SERVICE_ROLE_KEY not found. Admin operations (like file uploads) may fail due to RLS policies.")
         return False
     
     if "your-service-role" in SUPABASE_SERVICE_ROLE_KEY:
-        print("⚠️  SUPABASE_SERVICE_ROLE_KEY contains placeholder text.")
+        logger.warning("SUPABASE_SERVICE_ROLE_KEY contains placeholder text.")
         return False
     
     return True
@@ -60,28 +79,102 @@ def get_supabase_admin_client() -> Optional[Client]:
     
     return create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
-try:
-    # Regular client for user operations
-    supabase: Client = get_supabase_client()
-    print("✅ Supabase client initialized successfully")
-    
-    # Admin client for storage operations (bypasses RLS)
-    supabase_admin: Optional[Client] = get_supabase_admin_client()
-    if supabase_admin:
-        print("✅ Supabase admin client initialized successfully")
-    else:
-        print("⚠️  Supabase admin client not available - add SUPABASE_SERVICE_ROLE_KEY to .env")
-        
-except Exception as e:
-    print(f"❌ Supabase initialization failed: {e}")
-    print("\n🔧 To fix this:")
-    print("1. Go to your Supabase dashboard: https://supabase.com/dashboard")
-    print("2. Select your project")
-    print("3. Go to Settings → API")
-    print("4. Copy your Project URL and anon/public key")
-    print("5. For file uploads, also copy the service_role key")
-    print("6. Add them to your .env file:")
-    print("   SUPABASE_URL=your-project-url")
-    print("   SUPABASE_ANON_KEY=your-anon-key")
-    print("   SUPABASE_SERVICE_ROLE_KEY=your-service-role-key")
-    raise
\ No newline at end of file
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """Async PostgREST client backed by a bounded keep-alive connection pool"""
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=httpx.Timeout(
+                SUPABASE_READ_TIMEOUT,
+                connect=SUPABASE_CONNECT_TIMEOUT,
+                pool=SUPABASE_POOL_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=SUPABASE_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=SUPABASE_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=SUPABASE_POOL_KEEPALIVE_EXPIRY,
+            ),
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=True,
+        )
+
+_async_db: Optional[PooledPostgrestClient] = None
+
+def get_async_db() -> PooledPostgrestClient:
+    """Get the shared async PostgREST client, creating it on first use"""
+    global _async_db
+    if _async_db is None:
+        validate_supabase_config()
+        _async_db = PooledPostgrestClient(
+            f"{SUPABASE_URL}/rest/v1",
+            headers={
+                "apikey": SUPABASE_ANON_KEY,
+                "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+            },
+        )
+    return _async_db
+
+async def close_async_db():
+    """Close the shared async client and release pooled connections"""
+    global _async_db
+    if _async_db is not None:
+        await _async_db.aclose()
+        _async_db = None
+
+# Storage clients are created once, by init_clients() in the lifespan hook
+# or on first use, never at import time
+_supabase: Optional[Client] = None
+_supabase_admin: Optional[Client] = None
+_admin_checked = False
+
+def get_supabase() -> Client:
+    """Shared client for user operations"""
+    global _supabase
+    if _supabase is None:
+        _supabase = get_supabase_client()
+    return _supabase
+
+def get_supabase_admin() -> Optional[Client]:
+    """Shared admin client for storage operations (bypasses RLS), or None without a service role key"""
+    global _supabase_admin, _admin_checked
+    if not _admin_checked:
+        _supabase_admin = get_supabase_admin_client()
+        _admin_checked = True
+    return _supabase_admin
+
+def init_clients() -> bool:
+    """Create the shared clients up front; logs and returns False instead of raising"""
+    try:
+        get_supabase()
+        get_async_db()
+        logger.info("Supabase client initialized successfully")
+
+        if get_supabase_admin():
+            logger.info("Supabase admin client initialized successfully")
+        else:
+            logger.warning("Supabase admin client not available - add SUPABASE_SERVICE_ROLE_KEY to .env")
+        return True
+    except Exception as e:
+        logger.error(
+            "Supabase initialization failed: %s. To fix this: "
+            "1. Go to your Supabase dashboard: https://supabase.com/dashboard; "
+            "2. Select your project; "
+            "3. Go to Settings → API; "
+            "4. Copy your Project URL and anon/public key; "
+            "5. For file uploads, also copy the service_role key; "
+            "6. Add them to your .env file as SUPABASE_URL, SUPABASE_ANON_KEY and SUPABASE_SERVICE_ROLE_KEY", e,
+        )
+        return False
+
+async def warm_up_pool(connections: int):
+    """Open pooled connections (DNS, TLS and HTTP/2 setup) before the first request needs them"""
+    db = get_async_db()
+    await asyncio.gather(*[
+        db.table("users").select("id").limit(1).execute() for _ in range(max(1, connections))
+    ])
@@ -0,0 +1,108 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS
+from app.models.user import UserRecord
+
+
+class UserCache:
+    """Bounded per-process cache of user records with TTL expiry and LRU eviction.
+
+    Entries are stored once, keyed by user id, with a secondary index from
+    email to id so both lookups hit the same record. Records are the auth
+    view, so password hashes are never held here.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, UserRecord]]" = OrderedDict()
+        self._ids_by_email: Dict[str, str] = {}
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_by_id(self, user_id: str) -> Optional[UserRecord]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            self._remove(user_id)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def get_by_email(self, email: str) -> Optional[UserRecord]:
+        user_id = self._ids_by_email.get(email)
+        if user_id is None:
+            self.misses += 1
+            return None
+        return self.get_by_id(user_id)
+
+    @property
+    def generation(self) -> int:
+        """Bumped on every invalidation; pass it to put() to drop racing reads"""
+        return self._generation
+
+    def put(self, user: UserRecord, generation: Optional[int] = None):
+        if generation is not None and generation != self._generation:
+            # A write landed while this row was being fetched; it may be stale
+            return
+
+        user_id = user.id
+        if user_id in self._entries:
+            self._remove(user_id)
+
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, user)
+        if user.email:
+            self._ids_by_email[user.email] = user_id
+
+        while len(self._entries) > self.max_entries:
+            oldest_id = next(iter(self._entries))
+            self._remove(oldest_id)
+            self.evictions += 1
+
+    def invalidate(self, user_id: str):
+        self._generation += 1
+        if user_id in self._entries:
+            self._remove(user_id)
+            self.invalidations += 1
+
+    def _remove(self, user_id: str):
+        _, user = self._entries.pop(user_id)
+        email = user.email
+        if email and self._ids_by_email.get(email) == user_id:
+            del self._ids_by_email[email]
+
+    def clear(self):
+        self._entries.clear()
+        self._ids_by_email.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+user_cache = UserCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from postgrest.exceptions import APIError
+from sqlalchemy import create_engine, delete, event, inspect, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import (
+    USER_REPLICA_ENABLED,
+    USER_REPLICA_DB_PATH,
+    USER_REPLICA_SYNC_SECONDS,
+    USER_REPLICA_REBUILD_SECONDS,
+)
+from app.db.supabase_client import get_async_db
+from app.models.user import Base, User, UserRecord, USER_AUTH_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Rows committed slightly out of updated_at order are caught by re-reading
+# rows updated this long before the previous sync started
+SYNC_OVERLAP = timedelta(seconds=5)
+SYNC_PAGE_SIZE = 1000
+SYNC_SELECT = ", ".join(USER_AUTH_COLUMNS + ("created_at", "updated_at"))
+
+# Columns a write may carry over to the replica
+REPLICA_COLUMNS = frozenset(USER_AUTH_COLUMNS)
+
+users = User.__table__
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Supabase ISO timestamp as naive UTC, the form SQLite stores"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _to_record(row) -> UserRecord:
+    return UserRecord(
+        id=row.id,
+        username=row.username,
+        email=row.email,
+        profile_picture_url=row.profile_picture_url,
+        session_epoch=row.session_epoch,
+    )
+
+
+class UserReplica:
+    """Local SQLite copy of the auth view of the users table, on the User model.
+
+    Lookups by id or email are indexed point reads on a local file, fast
+    enough to run inline on the event loop. Writes made by this process are
+    applied straight after they reach Supabase; everything else arrives
+    through an incremental sync on ``updated_at``. A periodic rebuild also
+    drops rows deleted by other processes. Until the first full sync has
+    finished, or when syncing falls behind, lookups return None so callers
+    go to Supabase.
+    """
+
+    def __init__(self, db_path: str, enabled: bool):
+        self.db_path = db_path
+        self.enabled = enabled
+        self._engine: Optional[Engine] = None
+        # (updated_at, id) of the last row synced, and when that sync started
+        self._cursor: Optional[Tuple[str, str]] = None
+        self._read_at: Optional[datetime] = None
+        self._last_sync: float = 0.0
+        self._last_rebuild: float = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.syncs = 0
+        self.sync_errors = 0
+        self.rows_synced = 0
+
+    def _get_engine(self) -> Engine:
+        if self._engine is None:
+            engine = create_engine(
+                f"sqlite:///{self.db_path}",
+                connect_args={"check_same_thread": False},
+            )
+
+            @event.listens_for(engine, "connect")
+            def _set_pragmas(dbapi_connection, _):
+                dbapi_connection.execute("PRAGMA journal_mode=WAL")
+                dbapi_connection.execute("PRAGMA synchronous=NORMAL")
+
+            # A replica file from an older release may lack newer columns; it
+            # is only a copy, so start it over and let the next rebuild refill it
+            inspector = inspect(engine)
+            if inspector.has_table("users"):
+                existing = {column["name"] for column in inspector.get_columns("users")}
+                if not set(users.c.keys()) <= existing:
+                    users.drop(engine)
+            Base.metadata.create_all(engine, tables=[users])
+            self._engine = engine
+        return self._engine
+
+    @property
+    def ready(self) -> bool:
+        """True while the replica is fresh enough to answer reads"""
+        return (
+            self.enabled
+            and bool(self._last_rebuild)
+            and time.monotonic() - self._last_sync < USER_REPLICA_SYNC_SECONDS * 3
+        )
+
+    def _get_one(self, condition) -> Optional[UserRecord]:
+        if not self.ready:
+            return None
+        with self._get_engine().connect() as conn:
+            row = conn.execute(select(users).where(condition)).first()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _to_record(row)
+
+    def get_by_id(self, user_id: str) -> Optional[UserRecord]:
+        return self._get_one(users.c.id == user_id)
+
+    def get_by_email(self, email: str) -> Optional[UserRecord]:
+        return self._get_one(users.c.email == email)
+
+    def _upsert_rows(self, rows: Iterable[Dict[str, Any]]):
+        values = [
+            {
+                "id": row["id"],
+                "username": row.get("username"),
+                "email": row["email"],
+                "profile_picture_url": row.get("profile_picture_url"),
+                "session_epoch": row.get("session_epoch") or 0,
+                "created_at": _parse_timestamp(row.get("created_at")),
+                "updated_at": _parse_timestamp(row.get("updated_at")) or datetime.utcnow(),
+            }
+            for row in rows
+        ]
+        if not values:
+            return
+
+        with self._get_engine().begin() as conn:
+            for value in values:
+                # A username or email may have moved to another user since this
+                # copy of it was written; clear it so the unique indexes hold
+                clash = users.c.email == value["email"]
+                if value["username"]:
+                    clash = or_(clash, users.c.username == value["username"])
+                conn.execute(delete(users).where(clash, users.c.id != value["id"]))
+
+            statement = sqlite_insert(users)
+            conn.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[users.c.id],
+                    set_={
+                        "username": statement.excluded.username,
+                        "email": statement.excluded.email,
+                        "profile_picture_url": statement.excluded.profile_picture_url,
+                        "session_epoch": statement.excluded.session_epoch,
+                        "created_at": statement.excluded.created_at,
+                        "updated_at": statement.excluded.updated_at,
+                    },
+                ),
+                values,
+            )
+
+    # Writes run in a worker thread: a sync or rebuild holds SQLite's write
+    # lock from one, and waiting on it here must not stall the event loop
+
+    async def put(self, row: Dict[str, Any]):
+        """Write-through for a row this process just inserted into Supabase"""
+        if self.enabled:
+            await asyncio.to_thread(self._put, row)
+
+    def _put(self, row: Dict[str, Any]):
+        try:
+            self._upsert_rows([row])
+        except SQLAlchemyError as e:
+            logger.error("Error writing user replica: %s", e)
+
+    async def apply_update(self, user_id: str, update_data: Dict[str, Any]):
+        """Write-through for an update this process just made in Supabase"""
+        values = {key: value for key, value in update_data.items() if key in REPLICA_COLUMNS}
+        if self.enabled and values:
+            await asyncio.to_thread(self._apply_update, user_id, values)
+
+    def _apply_update(self, user_id: str, values: Dict[str, Any]):
+        values["updated_at"] = datetime.utcnow()
+        try:
+            with self._get_engine().begin() as conn:
+                conn.execute(update(users).where(users.c.id == user_id).values(**values))
+        except SQLAlchemyError as e:
+            # Drop the stale copy instead; the next sync brings the row back
+            logger.error("Error updating user replica: %s", e)
+            self._remove(user_id)
+
+    async def remove(self, user_id: str):
+        if self.enabled:
+            await asyncio.to_thread(self._remove, user_id)
+
+    def _remove(self, user_id: str):
+        try:
+            with self._get_engine().begin() as conn:
+                conn.execute(delete(users).where(users.c.id == user_id))
+        except SQLAlchemyError as e:
+            logger.error("Error removing from user replica: %s", e)
+
+    async def _pull(
+        self,
+        cursor: Optional[Tuple[str, str]],
+        since: Optional[datetime] = None,
+        seen: Optional[Set[str]] = None,
+    ) -> Optional[Tuple[str, str]]:
+        """Page rows after `cursor`, or updated at or after `since`, into the replica.
+
+        Pages follow an (updated_at, id) keyset cursor to the end of the
+        table, so rows sharing a timestamp, such as every row given the
+        column's default by users.sql, are all read. Returns the cursor of
+        the last row read, or the one passed in if there were none.
+        """
+        while True:
+            query = get_async_db().table("users").select(SYNC_SELECT)
+            if cursor:
+                updated_at, user_id = cursor
+                query = query.or_(f"updated_at.gt.{updated_at},and(updated_at.eq.{updated_at},id.gt.{user_id})")
+            elif since:
+                query = query.gte("updated_at", since.isoformat())
+            try:
+                response = await query.order("updated_at").order("id").limit(SYNC_PAGE_SIZE).execute()
+            except APIError as e:
+                raise RuntimeError(f"users sync query failed: {e}") from e
+
+            rows = response.data
+            await asyncio.to_thread(self._upsert_rows, rows)
+            self.rows_synced += len(rows)
+            if seen is not None:
+                seen.update(row["id"] for row in rows)
+
+            if rows:
+                cursor = (rows[-1]["updated_at"], rows[-1]["id"])
+            if len(rows) < SYNC_PAGE_SIZE:
+                return cursor
+
+    def _drop_unseen(self, seen: Set[str], started: datetime):
+        """Delete rows the rebuild did not read, unless written after it started.
+
+        A row put() or updated while the rebuild was paging may sit behind
+        its cursor, so not having seen it does not mean it is gone.
+        """
+        before = started.astimezone(timezone.utc).replace(tzinfo=None)
+        with self._get_engine().begin() as conn:
+            local_ids: List[str] = list(conn.execute(select(users.c.id).where(users.c.updated_at < before)).scalars())
+            gone = [user_id for user_id in local_ids if user_id not in seen]
+            for start in range(0, len(gone), 500):
+                conn.execute(delete(users).where(users.c.id.in_(gone[start:start + 500])))
+
+    async def rebuild(self):
+        """Pull every row again and drop the ones that no longer exist"""
+        seen: Set[str] = set()
+        started = datetime.now(timezone.utc)
+        cursor = await self._pull(None, seen=seen)
+        await asyncio.to_thread(self._drop_unseen, seen, started)
+        self._cursor, self._read_at = cursor, started
+        self._last_rebuild = self._last_sync = time.monotonic()
+
+    async def sync(self):
+        """Pull only rows updated since the last sync"""
+        if not self._last_rebuild or time.monotonic() - self._last_rebuild > USER_REPLICA_REBUILD_SECONDS:
+            await self.rebuild()
+        else:
+            started = datetime.now(timezone.utc)
+            since = self._read_at - SYNC_OVERLAP
+            if self._cursor is None or _parse_timestamp(self._cursor[0]) >= since.replace(tzinfo=None):
+                # The last read ended on recent rows, so others committed out
+                # of order may still land just before them; read that window again
+                cursor = await self._pull(None, since=since)
+            else:
+                cursor = await self._pull(self._cursor)
+            self._cursor, self._read_at = cursor or self._cursor, started
+            self._last_sync = time.monotonic()
+        self.syncs += 1
+
+    async def run_sync_loop(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                self.sync_errors += 1
+                logger.error("Error syncing user replica: %s", e)
+            await asyncio.sleep(USER_REPLICA_SYNC_SECONDS)
+
+    def close(self):
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "hits": self.hits,
+            "misses": self.misses,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "rows_synced": self.rows_synced,
+        }
+
+
+user_replica = UserReplica(USER_REPLICA_DB_PATH, USER_REPLICA_ENABLED)
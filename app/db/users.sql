@@ -0,0 +1,17 @@
+-- updated_at on the users table, which the local read replica in
+-- app/db/user_replica.py syncs from. Run once in the Supabase SQL editor.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS users_updated_at ON users (updated_at);
+
+CREATE OR REPLACE FUNCTION users_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_touch_updated_at ON users;
+CREATE TRIGGER users_touch_updated_at
+    BEFORE UPDATE ON users
+    FOR EACH ROW EXECUTE FUNCTION users_touch_updated_at();
@@ -1,19 +1,95 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 import asyncio
+import logging
+from contextlib import asynccontextmanager
 
-from app.core.config import CORS_ORIGINS
-from app.db.base import init_db
-from app.routers.auth import router as auth_router
+from PIL import Image
+
+from app.core.config import CORS_ORIGINS, STARTUP_WARMUP, WARMUP_CONNECTIONS, JWKS_MAX_AGE_SECONDS
+from app.core.log import setup_logging, shutdown_logging, RequestIdMiddleware, stats as logging_stats
+from app.db.base import check_db
+from app.db.supabase_client import init_clients, close_async_db, warm_up_pool
+from app.core.security import hashing_pool, claims_cache, load_hash_backend
+from app.core.keys import signing_keys
+from app.core.passwords import settings as password_hash_settings
+from app.core.metrics import registry, MetricsMiddleware, monitor_event_loop_lag
+from app.services.token_blacklist import token_blacklist
+from app.services.token_cleanup import token_cleanup
+from app.services.password_rehash import password_rehasher
+from app.db.user_cache import user_cache
+from app.db.user_replica import user_replica
+from app.db.crud import read_flights
+from app.services.image_pipeline import image_pool
+from app.services.jobs import job_queue
+from app.dependencies import verify_api_key
+from app.routers.auth import router as auth_router, rate_limiters
 from app.routers.profile import router as profile_router
+from app.routers.users import router as users_router
+from app.routers.boards import router as boards_router
+
+logger = logging.getLogger(__name__)
+
+class StartupState:
+    def __init__(self):
+        self.warmed_up = not STARTUP_WARMUP
+        self.tasks = []
+
+startup = StartupState()
+
+async def warm_up():
+    """Pre-open Supabase connections and start the worker pools; /ready waits for this"""
+    load_hash_backend()
+    results = await asyncio.gather(
+        warm_up_pool(WARMUP_CONNECTIONS),
+        hashing_pool.warm_up(load_hash_backend),
+        image_pool.warm_up(Image.init),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("Warm-up step failed: %s", result)
+    startup.warmed_up = True
+    logger.info("Warm-up finished")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing here waits on the network, so the worker starts serving (and
+    # answering liveness checks) at once; /ready reflects the slower parts
+    setup_logging()
+    init_clients()
+    # Local files only; creates the first signing key if there is none yet
+    signing_keys.signing_key()
+    startup.tasks = [
+        asyncio.create_task(token_cleanup.run_loop()),
+        asyncio.create_task(token_blacklist.run_sync_loop()),
+        asyncio.create_task(monitor_event_loop_lag()),
+    ]
+    if user_replica.enabled:
+        startup.tasks.append(asyncio.create_task(user_replica.run_sync_loop()))
+    if STARTUP_WARMUP:
+        startup.tasks.append(asyncio.create_task(warm_up()))
+    job_queue.start()
 
-init_db()
+    yield
+
+    for task in startup.tasks:
+        task.cancel()
+    await job_queue.stop()
+    await password_rehasher.close()
+    await close_async_db()
+    user_replica.close()
+    hashing_pool.shutdown()
+    image_pool.shutdown()
+    shutdown_logging()
 
 app = FastAPI(
     title="FlowSpace API",
     description="REST API for FlowSpace Kanban Board.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -24,28 +100,56 @@ app.add_middleware(
     allow_headers=["*"],            
 )
 
+app.add_middleware(RequestIdMiddleware)
+
+# Outermost, so the timings include every other middleware
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 app.include_router(profile_router, prefix="/api/profile", tags=["profile"])
+app.include_router(users_router, prefix="/api/users", tags=["users"])
+app.include_router(boards_router, prefix="/api/boards", tags=["boards"])
 
 @app.get("/", include_in_schema=False)
 async def root():
     return {"status": "ok"}
 
-async def cleanup_expired_tokens_task():
-    """Background task to clean up expired tokens"""
-    while True:
-        try:
-            from app.db.crud import cleanup_expired_tokens
-            cleanup_expired_tokens()
-            print("Cleaned up expired tokens")
-        except Exception as e:
-            print(f"Error in cleanup task: {e}")
-        
-        await asyncio.sleep(3600)
-
-@app.on_event("startup")
-async def startup_event():
-    asyncio.create_task(cleanup_expired_tokens_task())
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+async def jwks():
+    """Public keys that verify access tokens, for services checking them locally"""
+    return JSONResponse(signing_keys.jwks(), headers={"Cache-Control": f"public, max-age={JWKS_MAX_AGE_SECONDS}"})
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """Readiness probe: warm-up finished and Supabase answering"""
+    if not startup.warmed_up:
+        return JSONResponse({"status": "warming_up"}, status_code=503)
+    if not await check_db():
+        return JSONResponse({"status": "database_unavailable"}, status_code=503)
+    return {"status": "ready"}
+
+@app.get("/stats", include_in_schema=False, dependencies=[Depends(verify_api_key)])
+async def stats():
+    return {
+        "password_hash": hashing_pool.stats(),
+        "password_hash_settings": password_hash_settings(),
+        "password_rehash": password_rehasher.stats(),
+        "jwt_claims_cache": claims_cache.stats(),
+        "token_blacklist": token_blacklist.stats(),
+        "token_cleanup": token_cleanup.stats(),
+        "user_cache": user_cache.stats(),
+        "user_replica": user_replica.stats(),
+        "singleflight": read_flights.stats(),
+        "image": image_pool.stats(),
+        "jobs": job_queue.stats(),
+        "logging": logging_stats(),
+        "rate_limits": {limiter.name: limiter.stats() for limiter in rate_limiters},
+    }
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(verify_api_key)])
+async def metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 def custom_openapi():
     if app.openapi_schema:
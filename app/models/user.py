@@ -1,4 +1,6 @@
-from sqlalchemy import Column, String, DateTime
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import Column, String, DateTime, Integer
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -10,9 +12,13 @@ class User(Base):
     id = Column(String, primary_key=True, index=True)
     username = Column(String, unique=True, nullable=True, index=True)
     email = Column(String, unique=True, nullable=False, index=True)
-    hashed_password = Column(String, nullable=False)
+    # Left empty in the local read replica, which never copies password hashes
+    hashed_password = Column(String, nullable=True)
     profile_picture_url = Column(String, nullable=True)
+    # Bumped to revoke every access token issued before it
+    session_epoch = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
 
     def to_dict(self):
         return {
@@ -22,3 +28,31 @@ class User(Base):
             "profile_picture_url": self.profile_picture_url,  
             "created_at": self.created_at.isoformat(),
         }
+
+# Column projections for reads of the users table. The auth view is what an
+# authenticated request needs, the public view is what other users may see,
+# and only the full view carries the password hash.
+USER_PUBLIC_COLUMNS: Tuple[str, ...] = ("id", "username", "profile_picture_url")
+USER_AUTH_COLUMNS: Tuple[str, ...] = ("id", "username", "email", "profile_picture_url", "session_epoch")
+USER_FULL_COLUMNS: Tuple[str, ...] = USER_AUTH_COLUMNS + ("hashed_password", "created_at")
+
+@dataclass(frozen=True, slots=True)
+class UserRecord:
+    """Immutable row of the users table, decoded from one of the projections above.
+
+    Columns outside the projection that was read are left as None.
+    """
+
+    id: str
+    username: Optional[str] = None
+    email: Optional[str] = None
+    profile_picture_url: Optional[str] = None
+    session_epoch: int = 0
+    hashed_password: Optional[str] = field(default=None, repr=False)
+    created_at: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "UserRecord":
+        return cls(**{name: row[name] for name in _RECORD_FIELDS if name in row})
+
+_RECORD_FIELDS = tuple(f.name for f in fields(UserRecord))
@@ -1,15 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from app.schemas.user import UserSignUp, UserSignIn, Token, User
-from app.db.crud import get_user_by_email, get_user_by_username, create_user, get_user_by_id, add_token_to_blacklist, is_token_blacklisted
-from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES
-from app.core.security import verify_password, create_access_token
-from app.utils.exceptions import UserAlreadyExists, CredentialsInvalid
+from app.schemas.user import UserSignUp, UserSignIn, Token, User, RefreshRequest
+from app.db.crud import (
+    get_user_by_email,
+    get_user_credentials_by_email,
+    create_user,
+    get_user_by_id,
+    add_token_to_blacklist,
+    bump_session_epoch,
+    create_refresh_token,
+    get_refresh_token,
+    use_refresh_token,
+    revoke_refresh_family,
+    get_user_session,
+)
+from app.models.user import UserRecord
+from app.services.token_blacklist import token_blacklist
+from app.services.password_rehash import password_rehasher
+from app.core.config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS,
+    RATE_LIMIT_SIGNIN_PER_IP,
+    RATE_LIMIT_SIGNIN_PER_EMAIL,
+    RATE_LIMIT_SIGNUP_PER_IP,
+)
+from app.core.security import (
+    verify_password_async,
+    password_needs_update,
+    create_access_token,
+    decode_access_token,
+    claims_cache,
+    token_digest,
+    revocation_id,
+    session_is_current,
+    new_refresh_token,
+    hash_refresh_token,
+)
+from app.utils.exceptions import (
+    UserAlreadyExists,
+    CredentialsInvalid,
+    UniqueViolation,
+    RefreshTokenInvalid,
+    DataUnavailable,
+    DatabaseUnavailable,
+)
+from app.utils.http_cache import make_etag, etag_matches, not_modified, set_cache_headers
+from app.utils.rate_limit import RateLimiter, client_ip, limit_by_ip
 
 router = APIRouter()
 
+# Checked before any lookup or bcrypt work, so a client hammering these
+# endpoints cannot tie up the hashing pool for everyone else. The email limit
+# is per email and client IP: keyed by email alone, anyone could lock a user
+# out of signing in by sending a few wrong passwords a minute
+signin_ip_limit = RateLimiter("signin_ip", RATE_LIMIT_SIGNIN_PER_IP)
+signin_email_limit = RateLimiter("signin_email", RATE_LIMIT_SIGNIN_PER_EMAIL)
+signup_ip_limit = RateLimiter("signup_ip", RATE_LIMIT_SIGNUP_PER_IP)
+rate_limiters = (signin_ip_limit, signin_email_limit, signup_ip_limit)
+
 def extract_token_from_header(request: Request) -> Optional[str]:
     """Extract Bearer token from Authorization header"""
     auth_header = request.headers.get("Authorization")
@@ -22,140 +74,198 @@ def extract_token_from_header(request: Request) -> Optional[str]:
     token = auth_header[7:]  
     return token if token else None
 
-def decode_jwt_token(token: str) -> Optional[str]:
+async def decode_jwt_token(token: str) -> Optional[str]:
     """Decode JWT token and return email"""
-    try:
-        from jose import JWTError, jwt
-        from app.core.config import SECRET_KEY, ALGORITHM
-
-        if is_token_blacklisted(token):
-            return None
-       
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        return email
-    except JWTError:
+    claims = decode_access_token(token)
+    if not claims or await token_blacklist.is_revoked(revocation_id(token, claims)):
         return None
+    return claims.get("sub")
+
+async def authenticate_request(request: Request) -> Optional[dict]:
+    """Verify the request's bearer token once and keep the claims on request.state"""
+    if hasattr(request.state, "auth_claims"):
+        return request.state.auth_claims
 
-async def get_current_user(request: Request) -> dict:
-    """Dependency to get current authenticated user"""
     token = extract_token_from_header(request)
-    if not token:
+    claims = decode_access_token(token) if token else None
+    if claims and await token_blacklist.is_revoked(revocation_id(token, claims)):
+        claims = None
+
+    request.state.auth_token = token
+    request.state.auth_claims = claims
+    return claims
+
+async def get_current_user(request: Request) -> UserRecord:
+    """Dependency to get current authenticated user"""
+    claims = await authenticate_request(request)
+    if not request.state.auth_token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication required"
         )
     
-    email = decode_jwt_token(token)
+    email = claims.get("sub") if claims else None
     if not email:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token"
         )
     
-    user = get_user_by_email(email)
+    user = await get_user_by_email(email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
+    if not session_is_current(claims, user.session_epoch):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session has been revoked"
+        )
+    
     return user
 
-@router.post("/signup", response_model=Token)
+async def issue_tokens(user_id: str, username: Optional[str], email: str, session_epoch: int, family_id: Optional[str] = None) -> Token:
+    """A short-lived access token plus the next refresh token in ``family_id`` (a new family on sign-in)"""
+    expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(subject=email, expires_delta=expires, session_epoch=session_epoch)
+
+    refresh_token, token_hash = new_refresh_token()
+    refresh_expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    if not await create_refresh_token(token_hash, family_id or str(uuid.uuid4()), user_id, session_epoch, refresh_expires_at):
+        # Still signed in, just until the access token expires
+        refresh_token = None
+
+    return Token(
+        access_token=access_token,
+        token_type="bearer",
+        expires_in=int(expires.total_seconds()),
+        refresh_token=refresh_token,
+        user={"id": user_id, "username": username, "email": email},
+    )
+
+@router.post("/signup", response_model=Token, dependencies=[Depends(limit_by_ip(signup_ip_limit))])
 async def sign_up(data: UserSignUp):
-    if get_user_by_email(data.email):
-        raise UserAlreadyExists("email")
-    if get_user_by_username(data.username):
-        raise UserAlreadyExists("username")
-   
-    user_id = create_user(data.username, data.email, data.password)
+    try:
+        user_id = await create_user(data.username, data.email, data.password)
+    except UniqueViolation as e:
+        raise UserAlreadyExists(e.field)
     if not user_id:
         raise HTTPException(
             status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create user",
         )
    
-    expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(subject=data.email, expires_delta=expires)
-   
-    return Token(
-        access_token=access_token,
-        token_type="bearer",
-        user={"id": user_id, "username": data.username, "email": data.email},
-    )
+    return await issue_tokens(user_id, data.username, data.email, session_epoch=0)
 
-@router.post("/signin", response_model=Token)
-async def sign_in(data: UserSignIn):
-    user = get_user_by_email(data.email)
-    if not user or not verify_password(data.password, user["hashed_password"]):
+@router.post("/signin", response_model=Token, dependencies=[Depends(limit_by_ip(signin_ip_limit))])
+async def sign_in(data: UserSignIn, request: Request):
+    signin_email_limit.check(f"{data.email.lower()} {client_ip(request)}")
+    user = await get_user_credentials_by_email(data.email)
+    if not user or not await verify_password_async(data.password, user.hashed_password):
         raise CredentialsInvalid()
+    if password_needs_update(user.hashed_password):
+        password_rehasher.schedule(user.id, data.password, user.hashed_password)
    
-    expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(subject=data.email, expires_delta=expires)
-   
-    return Token(
-        access_token=access_token,
-        token_type="bearer",
-        user={
-            "id": user["id"], 
-            "username": user["username"], 
-            "email": user["email"]
-        },
-    )
+    return await issue_tokens(user.id, user.username, user.email, user.session_epoch)
+
+@router.post("/refresh", response_model=Token)
+async def refresh(data: RefreshRequest):
+    """
+    Trade a refresh token for a new access token and the next refresh token.
+    Each refresh token works once; presenting one again revokes its whole
+    family, since it means the token was copied. The exception is a repeat
+    within REFRESH_TOKEN_REUSE_GRACE_SECONDS of the first use, such as two
+    tabs refreshing together, which gets its own new tokens in the family.
+    """
+    try:
+        stored = await get_refresh_token(hash_refresh_token(data.refresh_token))
+        now = datetime.now(timezone.utc)
+        if not stored or stored["revoked_at"] or datetime.fromisoformat(stored["expires_at"]) <= now:
+            raise RefreshTokenInvalid()
+
+        if not stored["used_at"] and not await use_refresh_token(stored["id"]):
+            # Used (or revoked) since it was read; look again to tell which
+            stored = await get_refresh_token(hash_refresh_token(data.refresh_token))
+            if not stored or stored["revoked_at"]:
+                raise RefreshTokenInvalid()
+        if stored["used_at"]:
+            used_at = datetime.fromisoformat(stored["used_at"])
+            if (now - used_at).total_seconds() > REFRESH_TOKEN_REUSE_GRACE_SECONDS:
+                await revoke_refresh_family(stored["family_id"])
+                raise RefreshTokenInvalid()
+
+        # Read fresh, not from the user cache: this is where revocation is enforced
+        user = await get_user_session(stored["user_id"])
+    except DataUnavailable:
+        # Not knowing whether the token was reused is no reason to end the session
+        raise DatabaseUnavailable()
+    if not user or user.session_epoch != stored["session_epoch"]:
+        raise RefreshTokenInvalid()
+
+    return await issue_tokens(user.id, user.username, user.email, user.session_epoch, stored["family_id"])
    
 @router.get("/me")
-async def get_current_user_simple(request: Request):
-    """Get current user info"""
-    auth_header = request.headers.get("Authorization", "")
-   
-    if not auth_header or not auth_header.startswith("Bearer "):
+async def get_current_user_simple(request: Request, response: Response):
+    """Get current user info; answers 304 when If-None-Match still matches"""
+    claims = await authenticate_request(request)
+    if not request.state.auth_token:
         return {"error": "No valid authorization header", "status": 401}
    
-    token = auth_header.split(" ")[1]
-   
-    try:
-        from jose import jwt
-        from app.core.config import SECRET_KEY, ALGORITHM
-       
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-       
-        if email:
-            user = get_user_by_email(email)
-            if user:
-                return {
-                    "id": user["id"],
-                    "username": user["username"],
-                    "email": user["email"],
-                    "profile_picture_url": user.get("profile_picture_url"),
-                    "status": "success"
-                }
-    except Exception as e:
-        print(f"Auth error: {e}")
+    email = claims.get("sub") if claims else None
+    if email:
+        user = await get_user_by_email(email)
+        if user and session_is_current(claims, user.session_epoch):
+            etag = make_etag("me", user.id, user.username, user.email, user.profile_picture_url)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            set_cache_headers(response, etag)
+            return {
+                "id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "profile_picture_url": user.profile_picture_url,
+                "status": "success"
+            }
    
     return {"error": "Authentication failed", "status": 401}
 
 @router.post("/logout")
-async def logout(request: Request):
+async def logout(request: Request, data: Optional[RefreshRequest] = None):
     """
-    Logout endpoint - adds token to blacklist
+    Logout endpoint - adds token to blacklist, and ends the refresh token's
+    family when one is sent in the body
     """
-    token = extract_token_from_header(request)
+    claims = await authenticate_request(request)
+    token = request.state.auth_token
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="No token provided"
         )
     
-    email = decode_jwt_token(token)
-    if not email:
+    if not claims or not claims.get("sub"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token"
         )
     
-    if add_token_to_blacklist(token, ACCESS_TOKEN_EXPIRE_MINUTES):
+    if data is not None:
+        try:
+            stored = await get_refresh_token(hash_refresh_token(data.refresh_token))
+        except DataUnavailable:
+            # Retry rather than report a logout that left the refresh token alive
+            raise DatabaseUnavailable()
+        if stored:
+            await revoke_refresh_family(stored["family_id"])
+
+    # Only the compact jti is stored, and only until the token would expire anyway
+    jti = revocation_id(token, claims)
+    expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc)
+    if await add_token_to_blacklist(jti, expires_at):
+        token_blacklist.add(jti, expires_at)
+        claims_cache.discard(token_digest(token))
         return {
             "message": "Logged out successfully",
             "status": "success"
@@ -165,3 +275,18 @@ async def logout(request: Request):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Logout failed"
         )
+
+@router.post("/logout-all")
+async def logout_all(current_user: UserRecord = Depends(get_current_user)):
+    """
+    Log out everywhere - revokes every token issued to the user so far
+    """
+    if await bump_session_epoch(current_user.id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Logout failed"
+        )
+    return {
+        "message": "Logged out of all sessions",
+        "status": "success"
+    }
@@ -0,0 +1,119 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.routers.auth import get_current_user
+from app.models.user import UserRecord
+from app.schemas.board import (
+    Board,
+    BoardCreate,
+    BoardDetail,
+    Card,
+    CardCreate,
+    CardMove,
+    CardUpdate,
+    Column,
+    ColumnCreate,
+    ColumnMove,
+    ColumnUpdate,
+)
+from app.db import boards as board_crud
+from app.utils.exceptions import BoardNotFound, MissingReference
+
+router = APIRouter()
+
+async def get_owned_board_id(board_id: str, current_user: UserRecord = Depends(get_current_user)) -> str:
+    """Dependency: the board id, once the current user is known to own it"""
+    if await board_crud.get_board_owner(board_id) != current_user.id:
+        raise BoardNotFound()
+    return board_id
+
+@router.get("", response_model=List[Board])
+async def list_boards(current_user: UserRecord = Depends(get_current_user)):
+    return await board_crud.list_boards(current_user.id)
+
+@router.post("", response_model=Board, status_code=status.HTTP_201_CREATED)
+async def create_board(data: BoardCreate, current_user: UserRecord = Depends(get_current_user)):
+    board = await board_crud.create_board(current_user.id, data.name)
+    if not board:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create board")
+    return board
+
+@router.get("/{board_id}", response_model=BoardDetail)
+async def get_board(board_id: str = Depends(get_owned_board_id)):
+    """The whole board, columns and cards in display order, in one query"""
+    board = await board_crud.load_board(board_id)
+    if not board:
+        raise BoardNotFound()
+    return board
+
+@router.delete("/{board_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_board(board_id: str = Depends(get_owned_board_id)):
+    if not await board_crud.delete_board(board_id):
+        raise BoardNotFound()
+
+@router.post("/{board_id}/columns", response_model=Column, status_code=status.HTTP_201_CREATED)
+async def create_column(data: ColumnCreate, board_id: str = Depends(get_owned_board_id)):
+    column = await board_crud.create_column(board_id, data.name)
+    if not column:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create column")
+    return column
+
+@router.patch("/{board_id}/columns/{column_id}", response_model=Column)
+async def rename_column(column_id: str, data: ColumnUpdate, board_id: str = Depends(get_owned_board_id)):
+    column = await board_crud.rename_column(board_id, column_id, data.name)
+    if not column:
+        raise BoardNotFound("Column")
+    return column
+
+@router.post("/{board_id}/columns/{column_id}/move", response_model=Column)
+async def move_column(column_id: str, data: ColumnMove, board_id: str = Depends(get_owned_board_id)):
+    try:
+        column = await board_crud.move_column(board_id, column_id, data.prev_rank, data.next_rank)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not column:
+        raise BoardNotFound("Column")
+    return column
+
+@router.delete("/{board_id}/columns/{column_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_column(column_id: str, board_id: str = Depends(get_owned_board_id)):
+    if not await board_crud.delete_column(board_id, column_id):
+        raise BoardNotFound("Column")
+
+@router.post("/{board_id}/columns/{column_id}/cards", response_model=Card, status_code=status.HTTP_201_CREATED)
+async def create_card(column_id: str, data: CardCreate, board_id: str = Depends(get_owned_board_id)):
+    try:
+        card = await board_crud.create_card(board_id, column_id, data.title, data.description)
+    except MissingReference:
+        raise BoardNotFound("Column")
+    if not card:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create card")
+    return card
+
+@router.patch("/{board_id}/cards/{card_id}", response_model=Card)
+async def update_card(card_id: str, data: CardUpdate, board_id: str = Depends(get_owned_board_id)):
+    update_data = data.model_dump(exclude_unset=True)
+    if not update_data:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nothing to update")
+    card = await board_crud.update_card(board_id, card_id, update_data)
+    if not card:
+        raise BoardNotFound("Card")
+    return card
+
+@router.post("/{board_id}/cards/{card_id}/move", response_model=Card)
+async def move_card(card_id: str, data: CardMove, board_id: str = Depends(get_owned_board_id)):
+    """Drag-and-drop: one single-row update, whichever column the card lands in"""
+    try:
+        card = await board_crud.move_card(board_id, card_id, data.column_id, data.prev_rank, data.next_rank)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except MissingReference:
+        raise BoardNotFound("Column")
+    if not card:
+        raise BoardNotFound("Card")
+    return card
+
+@router.delete("/{board_id}/cards/{card_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_card(card_id: str, board_id: str = Depends(get_owned_board_id)):
+    if not await board_crud.delete_card(board_id, card_id):
+        raise BoardNotFound("Card")
@@ -1,101 +1,137 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from app.routers.auth import get_current_user
-from app.services.file_upload import FileUploadService
+from app.services.file_upload import FileUploadService, profile_picture_variants
+from app.services.upload_stream import ingest_image_upload
 from app.db.crud import update_user_profile_picture, get_user_profile_picture
+from app.models.user import UserRecord
+from app.utils.http_cache import make_etag, etag_matches, not_modified, set_cache_headers
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-async def _handle_profile_picture_upload(request: Request, file: UploadFile, current_user: dict):
+# The upload body is parsed by ingest_image_upload, so document it by hand
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+async def _handle_profile_picture_upload(request: Request, current_user: UserRecord):
     """Handles logic for uploading or changing a profile picture"""
+    upload = None
     try:
-        if not file.content_type or not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File must be an image")
-
-        file_content = await file.read()
         upload_service = FileUploadService()
-        current_pic_url = get_user_profile_picture(current_user["id"])
+        upload = await ingest_image_upload(request, max_bytes=upload_service.max_file_size)
+        file_content = upload.read()
+        current_pic_url = await get_user_profile_picture(current_user.id)
 
-        public_url = upload_service.upload_profile_picture(
-            user_id=current_user["id"],
+        public_url = await upload_service.upload_profile_picture(
+            user_id=current_user.id,
             file_content=file_content,
-            filename=file.filename
+            filename=upload.filename
         )
 
         if not public_url:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to upload image")
 
-        if update_user_profile_picture(current_user["id"], public_url):
-            if current_pic_url:
-                upload_service.delete_profile_picture(current_pic_url)
+        if public_url == current_pic_url or await update_user_profile_picture(current_user.id, public_url):
+            if current_pic_url and current_pic_url != public_url:
+                await upload_service.schedule_delete(current_pic_url)
 
             return {
                 "message": "Profile picture uploaded successfully",
                 "profile_picture_url": public_url,
-                "username": current_user["username"],
-                "email": current_user["email"],
+                "profile_picture_variants": profile_picture_variants(public_url),
+                "username": current_user.username,
+                "email": current_user.email,
                 "status": "success"
             }
         else:
-            upload_service.delete_profile_picture(public_url)
+            await upload_service.schedule_delete(public_url)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update profile picture")
 
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        print(f"Upload error: {e}")
+        logger.error("Upload error: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    finally:
+        if upload:
+            upload.close()
 
-@router.post("/upload-profile-picture")
+@router.post("/upload-profile-picture", openapi_extra=UPLOAD_REQUEST_BODY)
 async def upload_profile_picture(
     request: Request,
-    file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
+    current_user: UserRecord = Depends(get_current_user)
 ):
-    return await _handle_profile_picture_upload(request, file, current_user)
+    return await _handle_profile_picture_upload(request, current_user)
 
-@router.put("/profile-picture")
+@router.put("/profile-picture", openapi_extra=UPLOAD_REQUEST_BODY)
 async def change_profile_picture(
     request: Request,
-    file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
+    current_user: UserRecord = Depends(get_current_user)
 ):
-    return await _handle_profile_picture_upload(request, file, current_user)
+    return await _handle_profile_picture_upload(request, current_user)
 
 @router.delete("/profile-picture")
 async def delete_profile_picture(
     request: Request,
-    current_user: dict = Depends(get_current_user)
+    current_user: UserRecord = Depends(get_current_user)
 ):
     try:
-        current_pic_url = get_user_profile_picture(current_user["id"])
+        current_pic_url = await get_user_profile_picture(current_user.id)
         if not current_pic_url:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No profile picture found")
 
-        upload_service = FileUploadService()
-        if upload_service.delete_profile_picture(current_pic_url) and update_user_profile_picture(current_user["id"], None):
+        if await update_user_profile_picture(current_user.id, None):
+            await FileUploadService().schedule_delete(current_pic_url)
             return {
                 "message": "Profile picture deleted successfully",
                 "profile_picture_url": None,
-                "username": current_user["username"],
-                "email": current_user["email"],
+                "profile_picture_variants": None,
+                "username": current_user.username,
+                "email": current_user.email,
                 "status": "success"
             }
 
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to delete profile picture")
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Delete error: {e}")
+        logger.error("Delete error: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
 
 @router.get("/profile-picture")
 async def get_profile_picture(
     request: Request,
-    current_user: dict = Depends(get_current_user)
+    response: Response,
+    current_user: UserRecord = Depends(get_current_user)
 ):
-    profile_picture_url = get_user_profile_picture(current_user["id"])
+    """Current profile picture; answers 304 when If-None-Match still matches"""
+    profile_picture_url = current_user.profile_picture_url
+    etag = make_etag("profile-picture", current_user.username, current_user.email, profile_picture_url)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    set_cache_headers(response, etag)
     return {
         "profile_picture_url": profile_picture_url,
-        "username": current_user["username"],
-        "email": current_user["email"],
+        "profile_picture_variants": profile_picture_variants(profile_picture_url),
+        "username": current_user.username,
+        "email": current_user.email,
         "status": "success"
     }
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, Request
+
+from app.routers.auth import get_current_user
+from app.schemas.user import UserBatchRequest, UserBatchResponse, PublicUser
+from app.db.crud import get_users_by_ids
+from app.models.user import UserRecord
+from app.services.file_upload import profile_picture_variants
+from app.utils.dataloader import DataLoader
+from app.utils.exceptions import DataUnavailable, DatabaseUnavailable
+
+router = APIRouter()
+
+async def _load_users(user_ids):
+    users = await get_users_by_ids(user_ids)
+    return {user.id: user for user in users}
+
+def get_user_loader(request: Request) -> DataLoader:
+    """Per-request loader: every user lookup in one tick becomes one query"""
+    loader = getattr(request.state, "user_loader", None)
+    if loader is None:
+        loader = request.state.user_loader = DataLoader(_load_users)
+    return loader
+
+def to_public_user(user: UserRecord) -> PublicUser:
+    return PublicUser(
+        id=user.id,
+        username=user.username,
+        profile_picture_url=user.profile_picture_url,
+        profile_picture_variants=profile_picture_variants(user.profile_picture_url),
+    )
+
+@router.post("/batch", response_model=UserBatchResponse)
+async def get_users_batch(
+    data: UserBatchRequest,
+    current_user: UserRecord = Depends(get_current_user),
+    loader: DataLoader = Depends(get_user_loader),
+):
+    """Public profile fields for many users, e.g. every avatar on a board"""
+    try:
+        users = await loader.load_many(dict.fromkeys(data.ids))
+    except DataUnavailable:
+        raise DatabaseUnavailable()
+    return UserBatchResponse(users=[to_public_user(user) for user in users if user])
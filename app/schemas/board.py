@@ -0,0 +1,54 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class BoardCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=200)
+
+class Board(BaseModel):
+    id: str
+    owner_id: str
+    name: str
+    created_at: Optional[str] = None
+
+class ColumnCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=200)
+
+class ColumnUpdate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=200)
+
+class CardCreate(BaseModel):
+    title: str = Field(..., min_length=1, max_length=500)
+    description: Optional[str] = None
+
+class CardUpdate(BaseModel):
+    title: Optional[str] = Field(None, min_length=1, max_length=500)
+    description: Optional[str] = None
+
+class ColumnMove(BaseModel):
+    """Drop position, as the ranks of the neighbours on either side of it.
+
+    Leave out prev_rank to drop first and next_rank to drop last.
+    """
+    prev_rank: Optional[str] = Field(None, max_length=64)
+    next_rank: Optional[str] = Field(None, max_length=64)
+
+class CardMove(ColumnMove):
+    column_id: str
+
+class Card(BaseModel):
+    id: str
+    column_id: str
+    title: str
+    description: Optional[str] = None
+    rank: str
+
+class Column(BaseModel):
+    id: str
+    name: str
+    rank: str
+
+class ColumnWithCards(Column):
+    cards: List[Card] = []
+
+class BoardDetail(Board):
+    columns: List[ColumnWithCards] = []
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Dict, List, Optional
 
 class UserSignUp(BaseModel):
     username: str
@@ -14,6 +14,11 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     user: dict
+    expires_in: Optional[int] = None
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class User(BaseModel):
     id: str
@@ -24,3 +29,15 @@ class User(BaseModel):
 class UserUpdate(BaseModel):
     username: Optional[str] = None
     profile_picture_url: Optional[str] = None
+
+class UserBatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=500)
+
+class PublicUser(BaseModel):
+    id: str
+    username: Optional[str]
+    profile_picture_url: Optional[str] = None
+    profile_picture_variants: Optional[Dict[str, Dict[str, str]]] = None
+
+class UserBatchResponse(BaseModel):
+    users: List[PublicUser]
@@ -1,9 +1,57 @@
+import asyncio
+import hashlib
+import logging
 import os
-import uuid
-from typing import Optional
-from PIL import Image
-from io import BytesIO
-from app.db.supabase_client import supabase, supabase_admin
+from typing import Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.db.supabase_client import get_supabase, get_supabase_admin
+from app.db.crud import get_profile_pictures_in_use
+from app.services.jobs import job_queue
+from app.services.image_pipeline import (
+    image_pool,
+    process_profile_image,
+    process_profile_image_variants,
+    variant_name,
+    PIPELINE_VERSION,
+    VARIANT_SIZES,
+    VARIANT_FORMATS,
+    EXTENSION_CONTENT_TYPES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Job kind for removing a stored picture and its variants after the response
+DELETE_PICTURE_JOB = "storage.delete_profile_picture"
+
+# Variants are immutable once written, so CDNs and browsers may keep them for a year
+VARIANT_CACHE_SECONDS = "31536000"
+# The URL stored on the user row; the other variants sit next to it
+PRIMARY_VARIANT = variant_name(max(VARIANT_SIZES), "jpeg")
+
+def content_address(file_content: bytes) -> str:
+    """Hash of the upload plus pipeline version, used as the variant folder name"""
+    digest = hashlib.sha256(f"v{PIPELINE_VERSION}:".encode())
+    digest.update(file_content)
+    return digest.hexdigest()
+
+def profile_picture_variants(profile_picture_url: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+    """Map of size -> format -> URL for a stored profile picture URL.
+
+    Pictures uploaded before variants existed only have their single 400px
+    JPEG, which is reported as such.
+    """
+    if not profile_picture_url:
+        return None
+
+    url = profile_picture_url.split("?", 1)[0]
+    base, _, name = url.rpartition("/")
+    if name != PRIMARY_VARIANT:
+        return {str(max(VARIANT_SIZES)): {"jpeg": profile_picture_url}}
+
+    return {
+        str(size): {fmt: f"{base}/{variant_name(size, fmt)}" for fmt in VARIANT_FORMATS}
+        for size in sorted(VARIANT_SIZES)
+    }
 
 class FileUploadService:
     def __init__(self):
@@ -12,80 +60,127 @@ class FileUploadService:
         self.allowed_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
    
     def validate_image(self, file_content: bytes, filename: str) -> bool:
-        """Validate image file"""
+        """Cheap size and extension checks; decoding happens in the image pipeline"""
         if len(file_content) > self.max_file_size:
             raise ValueError("File size too large. Maximum 5MB allowed.")
        
         file_ext = os.path.splitext(filename)[1].lower()
         if file_ext not in self.allowed_extensions:
             raise ValueError(f"Invalid file type. Allowed: {', '.join(self.allowed_extensions)}")
-   
-        try:
-            Image.open(BytesIO(file_content))
-            return True
-        except Exception:
-            raise ValueError("Invalid image file")
+        return True
    
     def resize_image(self, file_content: bytes, max_size: tuple = (400, 400)) -> bytes:
         """Resize image to reduce file size"""
-        try:
-            image = Image.open(BytesIO(file_content))
-           
-            if image.mode == 'RGBA':
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                background.paste(image, mask=image.split()[-1])
-                image = background
-           
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
-           
-            output = BytesIO()
-            image.save(output, format='JPEG', quality=85, optimize=True)
-            return output.getvalue()
-        except Exception as e:
-            raise ValueError(f"Error processing image: {str(e)}")
+        return process_profile_image(file_content, max_size)
    
-    def upload_profile_picture(self, user_id: str, file_content: bytes, filename: str) -> Optional[str]:
-        """Upload profile picture to Supabase storage"""
+    def _storage_client(self, action: str):
+        # Use admin client to bypass RLS policies
+        supabase_admin = get_supabase_admin()
+        if not supabase_admin:
+            logger.warning("Using regular client for %s - may fail due to RLS policies", action)
+        return supabase_admin if supabase_admin else get_supabase()
+
+    def _object_path(self, file_url: str) -> str:
+        """Path of a stored object inside the bucket, from its public URL"""
+        url = file_url.split("?", 1)[0]
+        marker = f"/public/{self.bucket_name}/"
+        if marker in url:
+            return url.split(marker, 1)[1]
+        return url.split("/")[-1]
+
+    def _variant_paths(self, folder: str) -> List[str]:
+        return [f"{folder}/{variant_name(size, fmt)}" for size in VARIANT_SIZES for fmt in VARIANT_FORMATS]
+
+    async def upload_profile_picture(self, user_id: str, file_content: bytes, filename: str) -> Optional[str]:
+        """Upload every size/format variant of a profile picture to Supabase storage.
+
+        Variants live under ``{user_id}/{content hash}/``; when that folder
+        already holds them (the same image uploaded again) nothing is
+        processed or uploaded. Returns the public URL of the 400px JPEG.
+        Raises ValueError for files that are not acceptable images, and
+        ServiceOverloaded when the image pool is saturated.
+        """
+        self.validate_image(file_content, filename)
+        folder = f"{user_id}/{await run_in_threadpool(content_address, file_content)}"
+
         try:
-            self.validate_image(file_content, filename)
-           
-            resized_content = self.resize_image(file_content)
-           
-            file_ext = os.path.splitext(filename)[1].lower()
-            unique_filename = f"{user_id}_{uuid.uuid4()}{file_ext}"
-           
-            # Use admin client to bypass RLS policies
-            client_to_use = supabase_admin if supabase_admin else supabase
-            if not supabase_admin:
-                print("⚠️  Warning: Using regular client for upload - may fail due to RLS policies")
-           
-            response = client_to_use.storage.from_(self.bucket_name).upload(
-                path=unique_filename,
-                file=resized_content,
-                file_options={"content-type": f"image/{file_ext[1:]}"}
-            )
-           
-            if response:
-                public_url = client_to_use.storage.from_(self.bucket_name).get_public_url(unique_filename)
-                return public_url
-           
+            client_to_use = self._storage_client("upload")
+            bucket = client_to_use.storage.from_(self.bucket_name)
+            primary_url = bucket.get_public_url(f"{folder}/{PRIMARY_VARIANT}").rstrip("?")
+            # The same image may have been replaced moments ago; its folder is
+            # about to be live again, so it must not be deleted after all
+            await job_queue.cancel(DELETE_PICTURE_JOB, {"url": primary_url})
+
+            existing = await run_in_threadpool(bucket.list, folder)
+            existing_names = {item.get("name") for item in existing or []}
+            if all(path.rsplit("/", 1)[1] in existing_names for path in self._variant_paths(folder)):
+                return primary_url
+        except Exception as e:
+            logger.error("Error checking existing variants: %s", e)
             return None
+
+        variants = await image_pool.run(process_profile_image_variants, file_content)
+
+        try:
+            await asyncio.gather(*[
+                run_in_threadpool(
+                    bucket.upload,
+                    path=f"{folder}/{name}",
+                    file=content,
+                    file_options={
+                        "content-type": EXTENSION_CONTENT_TYPES[name.rsplit(".", 1)[1]],
+                        "cache-control": VARIANT_CACHE_SECONDS,
+                        "upsert": "true",
+                    }
+                )
+                for name, content in variants.items()
+            ])
+            return primary_url
         except Exception as e:
-            print(f"Error uploading file: {e}")
+            logger.error("Error uploading file: %s", e)
             return None
    
+    def picture_paths(self, file_url: str) -> List[str]:
+        """Every stored object belonging to a profile picture URL"""
+        object_path = self._object_path(file_url)
+        folder, _, name = object_path.rpartition("/")
+        if folder and name == PRIMARY_VARIANT:
+            return self._variant_paths(folder)
+        return [object_path]
+
+    def remove_objects(self, paths: List[str]) -> list:
+        """Remove objects in one storage call; raises on failure so jobs can retry"""
+        client_to_use = self._storage_client("delete")
+        return client_to_use.storage.from_(self.bucket_name).remove(paths)
+
     def delete_profile_picture(self, file_path: str) -> bool:
-        """Delete profile picture from Supabase storage"""
+        """Delete profile picture (and any variants next to it) from Supabase storage"""
         try:
-            filename = file_path.split('/')[-1]
-            
-            # Use admin client to bypass RLS policies
-            client_to_use = supabase_admin if supabase_admin else supabase
-            if not supabase_admin:
-                print("⚠️  Warning: Using regular client for delete - may fail due to RLS policies")
-            
-            response = client_to_use.storage.from_(self.bucket_name).remove([filename])
-            return bool(response)
+            return bool(self.remove_objects(self.picture_paths(file_path)))
         except Exception as e:
-            print(f"Error deleting file: {e}")
-            return False
\ No newline at end of file
+            logger.error("Error deleting file: %s", e)
+            return False
+
+    async def schedule_delete(self, file_url: str):
+        """Delete a profile picture in the background, after the response is sent"""
+        await job_queue.enqueue(DELETE_PICTURE_JOB, {"url": file_url})
+
+async def _delete_pictures_job(payloads: List[Dict[str, str]]):
+    """Job handler: remove every queued picture with a single storage call.
+
+    Pictures a user row points at again are kept: the same image uploaded
+    again reuses its content-addressed folder, possibly after the delete was
+    queued and on another worker.
+    """
+    service = FileUploadService()
+    urls = sorted({payload["url"] for payload in payloads})
+    in_use = await get_profile_pictures_in_use(urls)
+    if in_use is None:
+        raise RuntimeError("Could not check which profile pictures are still in use")
+
+    keep = {path for url in in_use for path in service.picture_paths(url)}
+    paths = sorted({path for url in urls for path in service.picture_paths(url)} - keep)
+    if paths:
+        await run_in_threadpool(service.remove_objects, paths)
+
+job_queue.register(DELETE_PICTURE_JOB, _delete_pictures_job)
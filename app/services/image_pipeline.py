@@ -0,0 +1,104 @@
+from io import BytesIO
+from typing import Dict, Iterable, Tuple
+
+from PIL import Image, features
+
+from app.core.config import IMAGE_POOL_WORKERS, IMAGE_POOL_MAX_QUEUE
+from app.core.workers import BoundedProcessPool
+
+image_pool = BoundedProcessPool(
+    "image",
+    max_workers=IMAGE_POOL_WORKERS or None,
+    max_queue=IMAGE_POOL_MAX_QUEUE,
+)
+
+# Bump when the output of the pipeline changes so content addresses change too
+PIPELINE_VERSION = 1
+VARIANT_SIZES = (400, 200, 96, 48)
+VARIANT_FORMATS = ("webp", "jpeg") if features.check("webp") else ("jpeg",)
+FORMAT_EXTENSIONS = {"jpeg": "jpg", "webp": "webp"}
+EXTENSION_CONTENT_TYPES = {"jpg": "image/jpeg", "webp": "image/webp"}
+
+
+def variant_name(size: int, fmt: str) -> str:
+    return f"{size}.{FORMAT_EXTENSIONS[fmt]}"
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """Convert to RGB, compositing any transparency onto white"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    if image.mode != "RGB":
+        return image.convert("RGB")
+    return image
+
+
+def _decode(file_content: bytes, max_size: Tuple[int, int]) -> Image.Image:
+    """Decode once; JPEGs are decoded at a reduced DCT scale close to max_size"""
+    try:
+        image = Image.open(BytesIO(file_content))
+        if image.format == "JPEG":
+            image.draft("RGB", max_size)
+        image.load()
+        return image
+    except Exception:
+        raise ValueError("Invalid image file")
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    output = BytesIO()
+    if fmt == "webp":
+        image.save(output, format="WEBP", quality=80, method=4)
+    else:
+        image.save(output, format="JPEG", quality=85, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def process_profile_image(file_content: bytes, max_size: Tuple[int, int] = (400, 400), quality: int = 85) -> bytes:
+    """Decode an upload once, shrink it to fit max_size and re-encode as JPEG.
+
+    Runs in a worker process. JPEGs are decoded at a reduced DCT scale when
+    the target is much smaller than the source, which skips most of the
+    decode work for large photos. Raises ValueError for anything PIL cannot
+    decode.
+    """
+    image = _decode(file_content, max_size)
+
+    try:
+        image = _flatten(image)
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+        output = BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+        return output.getvalue()
+    except Exception as e:
+        raise ValueError(f"Error processing image: {str(e)}")
+
+
+def process_profile_image_variants(
+    file_content: bytes,
+    sizes: Iterable[int] = VARIANT_SIZES,
+    formats: Iterable[str] = VARIANT_FORMATS,
+) -> Dict[str, bytes]:
+    """Decode an upload once and encode every size/format variant.
+
+    Sizes are produced largest first, each downscaled from the previous one
+    rather than from the original. Returns encoded bytes keyed by
+    variant_name(). Runs in a worker process.
+    """
+    sizes = sorted(sizes, reverse=True)
+    image = _decode(file_content, (sizes[0], sizes[0]))
+
+    try:
+        image = _flatten(image)
+        variants = {}
+        for size in sizes:
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                variants[variant_name(size, fmt)] = _encode(image, fmt)
+        return variants
+    except Exception as e:
+        raise ValueError(f"Error processing image: {str(e)}")
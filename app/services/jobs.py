@@ -0,0 +1,248 @@
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import (
+    JOB_QUEUE_DB_PATH,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BASE_SECONDS,
+    JOB_RETRY_MAX_SECONDS,
+    JOB_BATCH_SIZE,
+    JOB_POLL_SECONDS,
+    JOB_LEASE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# A handler receives the payloads of every due job of its kind in one call
+JobHandler = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_at);
+"""
+
+
+class JobQueue:
+    """In-process queue for work that should happen after the response is sent.
+
+    Jobs are persisted to a local SQLite file before enqueue() returns, so they
+    survive restarts. A worker task claims due jobs with a lease (so several
+    processes can share the file), hands every due job of one kind to its
+    handler in a single batch, and retries failures with exponential backoff.
+    Jobs that keep failing are kept as 'dead' rows for inspection.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._handlers: Dict[str, JobHandler] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.dead = 0
+        self.cancelled = 0
+        self.batches = 0
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _insert(self, kind: str, payload: str):
+        now = time.time()
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO jobs (kind, payload, run_at, created_at) VALUES (?, ?, ?, ?)",
+                (kind, payload, now, now),
+            )
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any]):
+        """Persist a job and wake the worker"""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        await asyncio.to_thread(self._insert, kind, json.dumps(payload))
+        self.enqueued += 1
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _claim(self) -> List[tuple]:
+        """Lease up to JOB_BATCH_SIZE due jobs of the kind with the oldest due job"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                due = "(status = 'pending' AND run_at <= ?) OR (status = 'running' AND lease_until < ?)"
+                first = conn.execute(
+                    f"SELECT kind FROM jobs WHERE {due} ORDER BY run_at LIMIT 1", (now, now)
+                ).fetchone()
+                if not first:
+                    conn.execute("COMMIT")
+                    return []
+
+                rows = conn.execute(
+                    f"SELECT id, kind, payload, attempts FROM jobs WHERE kind = ? AND ({due}) ORDER BY run_at LIMIT ?",
+                    (first[0], now, now, JOB_BATCH_SIZE),
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE jobs SET status = 'running', lease_until = ? WHERE id = ?",
+                    [(now + JOB_LEASE_SECONDS, row[0]) for row in rows],
+                )
+                conn.execute("COMMIT")
+                return rows
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _complete(self, ids: List[int]):
+        with self._lock:
+            self._connect().executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+
+    def _fail(self, rows: List[tuple], error: str) -> int:
+        """Reschedule with backoff, or mark dead; returns how many went dead"""
+        now = time.time()
+        updates, dead = [], 0
+        for job_id, _, _, attempts in rows:
+            attempts += 1
+            if attempts >= JOB_MAX_ATTEMPTS:
+                updates.append(("dead", attempts, now, error, job_id))
+                dead += 1
+            else:
+                delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+                delay *= random.uniform(0.5, 1.0)
+                updates.append(("pending", attempts, now + delay, error, job_id))
+        with self._lock:
+            self._connect().executemany(
+                "UPDATE jobs SET status = ?, attempts = ?, run_at = ?, last_error = ?, lease_until = NULL WHERE id = ?",
+                updates,
+            )
+        return dead
+
+    def _cancel(self, kind: str, payload: str) -> int:
+        with self._lock:
+            return self._connect().execute(
+                "DELETE FROM jobs WHERE kind = ? AND payload = ? AND status = 'pending'",
+                (kind, payload),
+            ).rowcount
+
+    async def cancel(self, kind: str, payload: Dict[str, Any]) -> int:
+        """Drop pending jobs with exactly this payload; returns how many.
+
+        Jobs already leased to a worker are not affected, so handlers must
+        still tolerate the work no longer being wanted.
+        """
+        cancelled = await asyncio.to_thread(self._cancel, kind, json.dumps(payload))
+        self.cancelled += cancelled
+        return cancelled
+
+    def _next_due_in(self) -> float:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT MIN(run_at) FROM jobs WHERE status = 'pending'"
+            ).fetchone()
+        if not row or row[0] is None:
+            return JOB_POLL_SECONDS
+        return max(0.0, min(JOB_POLL_SECONDS, row[0] - time.time()))
+
+    async def run_once(self) -> int:
+        """Process one batch; returns the number of jobs handled"""
+        rows = await asyncio.to_thread(self._claim)
+        if not rows:
+            return 0
+
+        kind = rows[0][1]
+        handler = self._handlers.get(kind)
+        self.batches += 1
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job kind '{kind}'")
+            await handler([json.loads(row[2]) for row in rows])
+        except Exception as e:
+            logger.error("Job batch '%s' failed (%d jobs): %s", kind, len(rows), e)
+            dead = await asyncio.to_thread(self._fail, rows, str(e))
+            self.dead += dead
+            self.retried += len(rows) - dead
+        else:
+            await asyncio.to_thread(self._complete, [row[0] for row in rows])
+            self.succeeded += len(rows)
+        return len(rows)
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            self._wakeup.clear()
+            try:
+                if await self.run_once():
+                    continue
+                timeout = await asyncio.to_thread(self._next_due_in)
+            except Exception as e:
+                logger.error("Error in job worker: %s", e)
+                timeout = JOB_POLL_SECONDS
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._connect().execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall())
+        return {
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "dead_rows": counts.get("dead", 0),
+            "enqueued": self.enqueued,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead": self.dead,
+            "cancelled": self.cancelled,
+            "batches": self.batches,
+        }
+
+
+job_queue = JobQueue(JOB_QUEUE_DB_PATH)
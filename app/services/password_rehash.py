@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from typing import Any, Dict, Set
+
+from app.core.security import hashing_pool, get_password_hash_async
+from app.db.crud import replace_password_hash
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordRehasher:
+    """Upgrades stale password hashes after a successful sign-in.
+
+    The plaintext is only available while the sign-in request is in flight,
+    so the new hash is computed then, but in a detached task: the response
+    never waits for the extra hash or the write. Rehashes are best effort.
+    They are skipped while sign-ins are queueing for the hashing pool, and
+    a failure is simply retried on the user's next sign-in.
+    """
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self._users: Set[str] = set()
+
+        self.scheduled = 0
+        self.skipped = 0
+        self.upgraded = 0
+        self.failed = 0
+
+    def schedule(self, user_id: str, password: str, old_hash: str):
+        if user_id in self._users or hashing_pool.queue_depth > 0:
+            self.skipped += 1
+            return
+        self.scheduled += 1
+        self._users.add(user_id)
+        task = asyncio.create_task(self._rehash(user_id, password, old_hash))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _rehash(self, user_id: str, password: str, old_hash: str):
+        try:
+            new_hash = await get_password_hash_async(password)
+            if await replace_password_hash(user_id, old_hash, new_hash):
+                self.upgraded += 1
+            else:
+                self.failed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Password rehash failed: %s", e)
+        finally:
+            self._users.discard(user_id)
+
+    async def close(self):
+        """Let in-flight rehashes finish; they are only a few hashes long"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._tasks),
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "upgraded": self.upgraded,
+            "failed": self.failed,
+        }
+
+
+password_rehasher = PasswordRehasher()
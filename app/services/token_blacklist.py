@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from app.core.config import (
+    TOKEN_BLACKLIST_SYNC_SECONDS,
+    TOKEN_BLACKLIST_REBUILD_SECONDS,
+    TOKEN_BLACKLIST_BLOOM_CAPACITY,
+    TOKEN_BLACKLIST_BLOOM_ERROR_RATE,
+)
+from app.core.security import token_digest
+from app.db.crud import get_blacklisted_tokens_after, is_token_blacklisted
+
+logger = logging.getLogger(__name__)
+
+# Rows committed slightly out of created_at order are caught by re-reading
+# rows created this long before the previous sync started
+SYNC_OVERLAP = timedelta(seconds=5)
+SYNC_PAGE_SIZE = 1000
+POSITIVE_SET_MAX = 10_000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 32-byte token digests"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes):
+        # Double hashing (Kirsch-Mitzenmacher) from two halves of the digest
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, digest: bytes):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+
+class TokenBlacklistCache:
+    """In-process view of token_blacklist, keyed by token jti.
+
+    A Bloom filter answers "definitely not revoked" without any I/O. Possible
+    hits are checked against a small, bounded set of digests known to be
+    revoked (local logouts and confirmed hits), and only then against the
+    database. The filter is kept current by an incremental sync loop and
+    rebuilt periodically so expired tokens age out of it.
+    """
+
+    def __init__(self):
+        self._bloom = self._new_bloom()
+        self._revoked: Dict[bytes, float] = {}
+        # (created_at, jti) of the last row synced, and when that sync started
+        self._cursor: Optional[Tuple[str, str]] = None
+        self._read_at: Optional[datetime] = None
+        self._last_sync: float = 0.0
+        self._last_rebuild: float = 0.0
+
+        self.negative_hits = 0
+        self.positive_hits = 0
+        self.db_checks = 0
+        self.false_positives = 0
+        self.syncs = 0
+        self.sync_errors = 0
+
+    def _new_bloom(self) -> BloomFilter:
+        return BloomFilter(TOKEN_BLACKLIST_BLOOM_CAPACITY, TOKEN_BLACKLIST_BLOOM_ERROR_RATE)
+
+    @property
+    def ready(self) -> bool:
+        """True while the filter is fresh enough to trust negative answers"""
+        return time.monotonic() - self._last_sync < TOKEN_BLACKLIST_SYNC_SECONDS * 3
+
+    def add(self, jti: str, expires_at: datetime):
+        """Record a revocation made by this worker immediately"""
+        digest = token_digest(jti)
+        self._bloom.add(digest)
+        self._remember(digest, expires_at.timestamp())
+
+    async def is_revoked(self, jti: str) -> bool:
+        if not self.ready:
+            self.db_checks += 1
+            return await is_token_blacklisted(jti)
+
+        digest = token_digest(jti)
+        if digest not in self._bloom:
+            self.negative_hits += 1
+            return False
+
+        expires_at = self._revoked.get(digest)
+        if expires_at is not None:
+            if expires_at > time.time():
+                self.positive_hits += 1
+                return True
+            del self._revoked[digest]
+
+        self.db_checks += 1
+        if await is_token_blacklisted(jti):
+            # Revocations are permanent, so repeats can skip the DB until the next rebuild
+            self._remember(digest, time.time() + TOKEN_BLACKLIST_REBUILD_SECONDS)
+            return True
+        self.false_positives += 1
+        return False
+
+    def _remember(self, digest: bytes, expires_at: float):
+        self._revoked[digest] = expires_at
+        if len(self._revoked) > POSITIVE_SET_MAX:
+            del self._revoked[next(iter(self._revoked))]
+
+    async def _pull(
+        self,
+        bloom: BloomFilter,
+        cursor: Optional[Tuple[str, str]],
+        since: Optional[datetime] = None,
+    ) -> Optional[Tuple[str, str]]:
+        """Page rows after `cursor`, or created at or after `since`, into `bloom`.
+
+        Pages follow a (created_at, jti) keyset cursor to the end of the
+        table, so any number of rows sharing a timestamp are all read.
+        Returns the cursor of the last row read, or the one passed in if
+        there were none.
+        """
+        if since and not cursor:
+            cursor = (since.isoformat(), "")
+        while True:
+            rows = await get_blacklisted_tokens_after(cursor, SYNC_PAGE_SIZE)
+            if rows is None:
+                raise RuntimeError("token_blacklist query failed")
+
+            for row in rows:
+                digest = token_digest(row["jti"])
+                # Rows re-read from the overlap are usually in the filter already
+                if digest not in bloom:
+                    bloom.add(digest)
+            if rows:
+                cursor = (rows[-1]["created_at"], rows[-1]["jti"])
+            if len(rows) < SYNC_PAGE_SIZE:
+                return cursor
+
+    async def rebuild(self):
+        """Reload every unexpired row into a fresh filter"""
+        bloom = self._new_bloom()
+        started = datetime.now(timezone.utc)
+        cursor = await self._pull(bloom, None)
+
+        # Keep revocations made locally while the reload was running
+        now = time.time()
+        self._revoked = {d: exp for d, exp in self._revoked.items() if exp > now}
+        for digest in self._revoked:
+            bloom.add(digest)
+
+        self._bloom = bloom
+        self._cursor, self._read_at = cursor, started
+        self._last_rebuild = self._last_sync = time.monotonic()
+
+    async def sync(self):
+        """Pull only rows added since the last sync"""
+        if (
+            not self._last_rebuild
+            or time.monotonic() - self._last_rebuild > TOKEN_BLACKLIST_REBUILD_SECONDS
+            or self._bloom.count > self._bloom.capacity
+        ):
+            await self.rebuild()
+        else:
+            started = datetime.now(timezone.utc)
+            since = self._read_at - SYNC_OVERLAP
+            if self._cursor is None or datetime.fromisoformat(self._cursor[0]) >= since:
+                # The last read ended on recent rows, so others committed out
+                # of order may still land just before them; read that window again
+                cursor = await self._pull(self._bloom, None, since)
+            else:
+                cursor = await self._pull(self._bloom, self._cursor)
+            self._cursor, self._read_at = cursor or self._cursor, started
+            self._last_sync = time.monotonic()
+        self.syncs += 1
+
+    async def run_sync_loop(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                self.sync_errors += 1
+                logger.error("Error syncing token blacklist: %s", e)
+            await asyncio.sleep(TOKEN_BLACKLIST_SYNC_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "bloom_entries": self._bloom.count,
+            "known_revoked": len(self._revoked),
+            "negative_hits": self.negative_hits,
+            "positive_hits": self.positive_hits,
+            "db_checks": self.db_checks,
+            "false_positives": self.false_positives,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+        }
+
+
+token_blacklist = TokenBlacklistCache()
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from app.core.config import (
+    TOKEN_CLEANUP_MIN_INTERVAL_SECONDS,
+    TOKEN_CLEANUP_MAX_INTERVAL_SECONDS,
+    TOKEN_CLEANUP_BATCH_SIZE,
+    TOKEN_CLEANUP_TIME_BUDGET_SECONDS,
+    TOKEN_CLEANUP_TARGET_ROWS,
+)
+from app.core.metrics import TOKENS_PURGED, TOKEN_CLEANUP_RUN_SECONDS
+from app.db.crud import acquire_lease, purge_expired_tokens
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "token_blacklist_cleanup"
+# Extra lease time beyond the run's budget, covering the last batch's round trip
+LEASE_MARGIN_SECONDS = 30
+
+
+class TokenCleanupScheduler:
+    """Purges expired token_blacklist rows from one worker at a time.
+
+    Every worker polls at the minimum interval, but a run only happens on
+    the one that takes the ``scheduler_leases`` row (app/db/maintenance.sql);
+    the others skip. A run deletes in batches of ``TOKEN_CLEANUP_BATCH_SIZE``
+    until a batch comes back short or the time budget is spent, then keeps
+    the lease for the next interval so no other worker starts early. The
+    holder itself also waits out that interval: ``acquire_lease`` always
+    hands a holder its own lease back, so that is only used to extend it.
+
+    The interval adapts to how fast tokens expire: it aims for about
+    ``TOKEN_CLEANUP_TARGET_ROWS`` rows per run, drops to the minimum while a
+    backlog remains, and grows to the maximum when nothing is expiring.
+    """
+
+    def __init__(self):
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.interval = TOKEN_CLEANUP_MIN_INTERVAL_SECONDS
+        self._last_run: Optional[float] = None
+
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.total_purged = 0
+        self.last_purged = 0
+        self.last_duration_ms = 0.0
+
+    def _next_interval(self, purged: int, backlog: bool, now: float) -> float:
+        if backlog:
+            return TOKEN_CLEANUP_MIN_INTERVAL_SECONDS
+        # Time since this worker last ran; an estimate, since other workers
+        # may have run in between, so capped at the longest interval
+        if self._last_run is None:
+            covered = self.interval
+        else:
+            covered = min(now - self._last_run, TOKEN_CLEANUP_MAX_INTERVAL_SECONDS)
+        rate = purged / covered if covered > 0 else 0.0
+        interval = TOKEN_CLEANUP_TARGET_ROWS / rate if rate else TOKEN_CLEANUP_MAX_INTERVAL_SECONDS
+        return max(TOKEN_CLEANUP_MIN_INTERVAL_SECONDS, min(TOKEN_CLEANUP_MAX_INTERVAL_SECONDS, interval))
+
+    async def run_once(self) -> Optional[int]:
+        """Purge if this worker wins the lease; returns rows removed, or None if it did not run"""
+        if self._last_run is not None and time.monotonic() < self._last_run + self.interval:
+            self.skipped += 1
+            return None
+        if not await acquire_lease(LEASE_NAME, self.holder, TOKEN_CLEANUP_TIME_BUDGET_SECONDS + LEASE_MARGIN_SECONDS):
+            self.skipped += 1
+            return None
+
+        start = time.perf_counter()
+        purged, backlog = 0, False
+        while True:
+            removed = await purge_expired_tokens(TOKEN_CLEANUP_BATCH_SIZE)
+            if removed is None:
+                self.errors += 1
+                break
+            purged += removed
+            if removed < TOKEN_CLEANUP_BATCH_SIZE:
+                break
+            if time.perf_counter() - start >= TOKEN_CLEANUP_TIME_BUDGET_SECONDS:
+                backlog = True
+                break
+        duration = time.perf_counter() - start
+
+        now = time.monotonic()
+        self.interval = self._next_interval(purged, backlog, now)
+        self._last_run = now
+        await acquire_lease(LEASE_NAME, self.holder, self.interval)
+
+        self.runs += 1
+        self.total_purged += purged
+        self.last_purged = purged
+        self.last_duration_ms = round(duration * 1000, 2)
+        TOKENS_PURGED.inc(purged)
+        TOKEN_CLEANUP_RUN_SECONDS.observe(duration)
+        logger.info(
+            "Purged %d expired tokens in %.2fs; next run in %ds", purged, duration, self.interval,
+            extra={"purged": purged, "duration_seconds": round(duration, 3), "backlog": backlog},
+        )
+        return purged
+
+    async def run_loop(self):
+        while True:
+            # Jitter keeps workers started together from polling in lockstep
+            await asyncio.sleep(TOKEN_CLEANUP_MIN_INTERVAL_SECONDS * random.uniform(0.8, 1.2))
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.errors += 1
+                logger.error("Error in token cleanup: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "holder": self.holder,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "total_purged": self.total_purged,
+            "last_purged": self.last_purged,
+            "last_duration_ms": self.last_duration_ms,
+            "interval_seconds": round(self.interval, 1),
+        }
+
+
+token_cleanup = TokenCleanupScheduler()
@@ -0,0 +1,175 @@
+from dataclasses import dataclass
+from tempfile import SpooledTemporaryFile
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import UPLOAD_SPOOL_BYTES
+from app.core.metrics import UPLOAD_BYTES
+from app.utils.exceptions import FileTooLarge
+
+# Enough bytes to recognise every signature below (WebP needs 12)
+SNIFF_BYTES = 12
+# Allowance for boundaries and part headers when pre-checking Content-Length
+MULTIPART_OVERHEAD = 16 * 1024
+
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Identify an image from its magic bytes"""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _not_an_image() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File must be an image")
+
+
+@dataclass
+class IngestedUpload:
+    filename: str
+    content_type: str
+    size: int
+    file: SpooledTemporaryFile
+
+    def read(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self):
+        self.file.close()
+
+
+class _ImagePartCollector:
+    """Multipart callbacks that keep one file field and enforce limits as bytes arrive"""
+
+    def __init__(self, field_name: str, max_bytes: int):
+        self.field_name = field_name
+        self.max_bytes = max_bytes
+        self.upload: Optional[IngestedUpload] = None
+
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._capturing = False
+        self._head = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._disposition = b""
+        self._capturing = False
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name != self.field_name or b"filename" not in options or self.upload is not None:
+            return
+
+        self._capturing = True
+        self._head = b""
+        self.upload = IngestedUpload(
+            filename=options[b"filename"].decode("utf-8", "replace"),
+            content_type="",
+            size=0,
+            file=SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES),
+        )
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._capturing:
+            return
+
+        chunk = data[start:end]
+        upload = self.upload
+        upload.size += len(chunk)
+        if upload.size > self.max_bytes:
+            raise FileTooLarge(self.max_bytes)
+
+        if not upload.content_type:
+            self._head += chunk[:SNIFF_BYTES]
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+        upload.file.write(chunk)
+
+    def on_part_end(self):
+        if self._capturing:
+            if not self.upload.content_type:
+                self._sniff()
+            self._capturing = False
+
+    def _sniff(self):
+        content_type = sniff_image_type(self._head)
+        if not content_type:
+            raise _not_an_image()
+        self.upload.content_type = content_type
+
+
+async def ingest_image_upload(request: Request, max_bytes: int, field_name: str = "file") -> IngestedUpload:
+    """Stream a multipart image upload into a spooled temp file.
+
+    The body is parsed as it arrives: the request is rejected as soon as the
+    file part exceeds ``max_bytes`` or its first bytes are not a known image
+    signature, without reading the rest. Files larger than UPLOAD_SPOOL_BYTES
+    spill to disk instead of staying in memory.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a multipart/form-data upload")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise FileTooLarge(max_bytes)
+
+    collector = _ImagePartCollector(field_name, max_bytes)
+    parser = MultipartParser(boundary, collector.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except MultipartParseError:
+        if collector.upload:
+            collector.upload.close()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed multipart body")
+    except Exception:
+        if collector.upload:
+            collector.upload.close()
+        raise
+
+    if collector.upload is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Missing file field '{field_name}'")
+    UPLOAD_BYTES.observe(collector.upload.size)
+    return collector.upload
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+BatchLoadFn = Callable[[List[K]], Awaitable[Dict[K, V]]]
+
+
+class DataLoader(Generic[K, V]):
+    """Coalesces individual loads into batched lookups.
+
+    Every load() made before the event loop gets back to this loader is
+    collected and resolved by one call to ``batch_load_fn`` with the unique
+    keys. Results are memoised for the loader's lifetime, so a loader should
+    be scoped to a single request.
+    """
+
+    def __init__(self, batch_load_fn: BatchLoadFn, max_batch_size: int = 500):
+        self.batch_load_fn = batch_load_fn
+        self.max_batch_size = max_batch_size
+        self._futures: Dict[K, "asyncio.Future[Optional[V]]"] = {}
+        self._queue: List[K] = []
+        self._scheduled = False
+
+        self.loads = 0
+        self.batches = 0
+
+    def load(self, key: K) -> "asyncio.Future[Optional[V]]":
+        self.loads += 1
+        future = self._futures.get(key)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._futures[key] = future
+        self._queue.append(key)
+        if not self._scheduled:
+            self._scheduled = True
+            # One more turn of the loop, so loads from tasks created in this
+            # tick (gather() over several lookups) join the same batch
+            loop.call_soon(loop.call_soon, self._dispatch)
+        return future
+
+    async def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*[self.load(key) for key in keys]))
+
+    def _dispatch(self):
+        queue, self._queue, self._scheduled = self._queue, [], False
+        for start in range(0, len(queue), self.max_batch_size):
+            asyncio.create_task(self._run_batch(queue[start:start + self.max_batch_size]))
+
+    async def _run_batch(self, keys: List[K]):
+        self.batches += 1
+        try:
+            results = await self.batch_load_fn(keys)
+        except Exception as e:
+            for key in keys:
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(results.get(key))
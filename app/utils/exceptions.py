@@ -1,5 +1,20 @@
 from fastapi import HTTPException, status
 
+class UniqueViolation(Exception):
+    """Raised by the data layer when an insert hits a unique constraint"""
+    def __init__(self, field: str):
+        super().__init__(f"Duplicate value for {field}")
+        self.field = field
+
+class MissingReference(Exception):
+    """Raised by the data layer when a write points at a row that does not exist"""
+    def __init__(self, field: str):
+        super().__init__(f"Unknown {field}")
+        self.field = field
+
+class DataUnavailable(Exception):
+    """Raised by the data layer when a lookup failed and guessing its answer would be unsafe"""
+
 class UserAlreadyExists(HTTPException):
     def __init__(self, field: str):
         detail = f"{field.capitalize()} already registered"
@@ -13,6 +28,13 @@ class CredentialsInvalid(HTTPException):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+class RefreshTokenInvalid(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+        )
+
 class NotAuthenticated(HTTPException):
     def __init__(self):
         super().__init__(
@@ -20,3 +42,38 @@ class NotAuthenticated(HTTPException):
             detail="Not authenticated",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+class ServiceOverloaded(HTTPException):
+    def __init__(self, retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+class DatabaseUnavailable(HTTPException):
+    def __init__(self, retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service temporarily unavailable, please retry",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+class TooManyRequests(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, please retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+class FileTooLarge(HTTPException):
+    def __init__(self, max_bytes: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size too large. Maximum {max_bytes // (1024 * 1024)}MB allowed.",
+        )
+
+class BoardNotFound(HTTPException):
+    def __init__(self, item: str = "Board"):
+        super().__init__(status_code=status.HTTP_404_NOT_FOUND, detail=f"{item} not found")
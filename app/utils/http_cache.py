@@ -0,0 +1,31 @@
+import hashlib
+from typing import Any
+from fastapi import Request, Response
+
+# Clients may keep the body but must revalidate it, which costs a 304
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the values a response body is built from"""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names ``etag``, using weak comparison as RFC 9110 asks"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(etag: str, cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def set_cache_headers(response: Response, etag: str, cache_control: str = PRIVATE_REVALIDATE):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
@@ -0,0 +1,87 @@
+"""Fractional rank keys for ordered lists such as columns and cards.
+
+A rank is a base-36 fraction written without the leading "0." and without
+trailing zeros, so plain string comparison (``COLLATE "C"`` in Postgres)
+matches numeric order. There is always a key strictly between two others,
+so moving an item only rewrites that item's rank. Keys grow when the same
+gap is split over and over; ``needs_rebalance`` tells when to respace them.
+"""
+from typing import List, Optional
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """Key strictly between ``a`` and ``b``; ``""`` is the start, None the end"""
+    if b is not None:
+        # Copy the shared prefix, treating a missing digit in ``a`` as zero
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _after(a: str) -> str:
+    """Short key after ``a``: bump its first digit that is not already the largest"""
+    for i, char in enumerate(a):
+        if char != DIGITS[-1]:
+            return a[:i] + DIGITS[DIGITS.index(char) + 1]
+    return a + DIGITS[1]
+
+
+def _before(b: str) -> str:
+    """Short key before ``b``: lower its first non-zero digit"""
+    for i, char in enumerate(b):
+        digit = DIGITS.index(char)
+        if digit > 1:
+            return b[:i] + DIGITS[digit - 1]
+        if digit == 1:
+            return b[:i] + DIGITS[0] + DIGITS[-1]
+    raise ValueError(f"Invalid rank {b!r}")
+
+
+def rank_between(before: Optional[str], after: Optional[str]) -> str:
+    """Rank that sorts after ``before`` and before ``after``; either may be None"""
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Rank {before!r} does not sort before {after!r}")
+    for key in (before, after):
+        if key is not None and (not key or key.endswith("0") or key.strip(DIGITS)):
+            raise ValueError(f"Invalid rank {key!r}")
+    # Appending and prepending are the common cases, so step by one digit
+    # there rather than halving the gap to the end of the key space
+    if before is not None and after is None:
+        return _after(before)
+    if before is None and after is not None:
+        return _before(after)
+    return _midpoint(before or "", after)
+
+
+def spread_ranks(count: int) -> List[str]:
+    """``count`` evenly spaced short ranks, leaving room at both ends"""
+    width = 1
+    while BASE ** width < (count + 1) * BASE:
+        width += 1
+    step = BASE ** width // (count + 1)
+
+    ranks = []
+    for i in range(1, count + 1):
+        value, digits = step * i, []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append("".join(reversed(digits)).rstrip("0"))
+    return ranks
+
+
+def needs_rebalance(rank: str, max_length: int) -> bool:
+    return len(rank) > max_length
@@ -0,0 +1,117 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Request
+
+from app.core.config import RATE_LIMIT_MAX_KEYS, RATE_LIMIT_TRUSTED_PROXY_HOPS
+from app.utils.exceptions import TooManyRequests
+
+
+def parse_rate(spec: str) -> Optional[Tuple[int, float]]:
+    """``"10/60"`` -> (10 requests, per 60 seconds); empty or ``"0"`` disables the limit"""
+    spec = spec.strip()
+    if not spec or spec == "0":
+        return None
+    count, _, seconds = spec.partition("/")
+    requests, period = int(count), float(seconds or 1)
+    if requests <= 0 or period <= 0:
+        raise ValueError(f"Invalid rate limit '{spec}', expected '<requests>/<seconds>'")
+    return requests, period
+
+
+class RateLimiter:
+    """Token buckets keyed by e.g. client IP or email, one per process.
+
+    Each key may make ``requests`` calls in a burst, refilled evenly over
+    ``period`` seconds. Buckets are kept in least-recently-used order: ones
+    idle long enough to have refilled completely are dropped from the front
+    as keys are touched, and the table never holds more than ``max_keys``
+    buckets, so every check is O(1) and memory stays bounded however many
+    distinct keys arrive.
+    """
+
+    def __init__(self, name: str, spec: str, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.name = name
+        self.max_keys = max_keys
+        rate = parse_rate(spec)
+        self.enabled = rate is not None
+        self.capacity, period = rate or (0, 1.0)
+        self.refill_per_second = self.capacity / period
+        self._full_after = period
+        # key -> [tokens, last update]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def _evict(self, now: float):
+        buckets = self._buckets
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if now - oldest[1] < self._full_after:
+                break
+            buckets.popitem(last=False)
+        if len(buckets) >= self.max_keys:
+            buckets.popitem(last=False)
+            self.evicted += 1
+
+    def hit(self, key: str) -> float:
+        """Take a token for ``key``; 0 if allowed, else seconds until one is available"""
+        if not self.enabled:
+            return 0.0
+
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._evict(now)
+            bucket = self._buckets[key] = [float(self.capacity), now]
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_per_second)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            self.allowed += 1
+            return 0.0
+        self.rejected += 1
+        return (1 - bucket[0]) / self.refill_per_second
+
+    def check(self, key: str):
+        """``hit`` that raises TooManyRequests, with Retry-After, when over the limit"""
+        retry_after = self.hit(key)
+        if retry_after:
+            raise TooManyRequests(math.ceil(retry_after))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "keys": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+        }
+
+
+def client_ip(request: Request) -> str:
+    """Caller's address, as seen by the outermost trusted proxy when there are any.
+
+    Each proxy appends the address it received the request from, so only
+    the rightmost ``RATE_LIMIT_TRUSTED_PROXY_HOPS`` entries are trustworthy;
+    anything further left came from the client and may be made up.
+    """
+    if RATE_LIMIT_TRUSTED_PROXY_HOPS:
+        hops = [hop.strip() for hop in ",".join(request.headers.getlist("x-forwarded-for")).split(",") if hop.strip()]
+        if len(hops) >= RATE_LIMIT_TRUSTED_PROXY_HOPS:
+            return hops[-RATE_LIMIT_TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+
+def limit_by_ip(limiter: RateLimiter):
+    """Route dependency applying ``limiter`` to the client IP before the handler runs"""
+    def dependency(request: Request):
+        limiter.check(client_ip(request))
+    return dependency
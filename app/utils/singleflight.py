@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers with the same key.
+
+    Keys are tuples whose first element names the kind of read, which is
+    what the counters are grouped by. The call runs in its own task and
+    every caller awaits it through a shield, so one caller being cancelled
+    does not cancel the read for the others. A failure is raised to every
+    caller that joined it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Tuple[Hashable, ...], "asyncio.Task[Any]"] = {}
+
+        self.calls: Dict[str, int] = {}
+        self.coalesced: Dict[str, int] = {}
+
+    async def do(self, key: Tuple[Hashable, ...], fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Await ``fn(*args)``, joining a call already running for ``key``"""
+        kind = str(key[0])
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced[kind] = self.coalesced.get(kind, 0) + 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Tuple[Hashable, ...], task: "asyncio.Task[Any]"):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the error retrieved in case every caller was cancelled
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        calls = sum(self.calls.values())
+        coalesced = sum(self.coalesced.values())
+        return {
+            "in_flight": len(self._calls),
+            "calls": calls,
+            "coalesced": coalesced,
+            "coalesced_ratio": round(coalesced / calls, 4) if calls else 0.0,
+            "by_kind": {
+                kind: {"calls": count, "coalesced": self.coalesced.get(kind, 0)}
+                for kind, count in self.calls.items()
+            },
+        }
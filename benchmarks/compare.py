@@ -0,0 +1,55 @@
+"""Compare two saved benchmark runs and flag regressions.
+
+Run with ``python -m benchmarks.compare baseline.json candidate.json``.
+Exits with status 1 when any shared benchmark's p95 latency grew, or its
+throughput fell, by more than ``--threshold`` percent.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+
+def _change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> bool:
+    """Print a table of changes; returns True if anything regressed"""
+    regressed = False
+    print(f"{'benchmark':<32} {'ops/s':>32} {'p95 ms':>34}")
+    for name, old in baseline["results"].items():
+        new = candidate["results"].get(name)
+        if new is None:
+            continue
+        throughput = _change(old["ops_per_sec"], new["ops_per_sec"])
+        p95 = _change(old["p95_ms"], new["p95_ms"])
+        flag = throughput < -threshold or p95 > threshold
+        regressed |= flag
+        print(
+            f"{name:<32} {old['ops_per_sec']:>9.1f} -> {new['ops_per_sec']:>9.1f} ({throughput:+.1f}%)"
+            f" {old['p95_ms']:>10.3f} -> {new['p95_ms']:>10.3f} ({p95:+.1f}%)"
+            + ("  REGRESSED" if flag else "")
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change that counts as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    if baseline.get("suite") != candidate.get("suite"):
+        parser.error(f"cannot compare a {baseline.get('suite')} run with a {candidate.get('suite')} run")
+
+    sys.exit(1 if compare(baseline, candidate, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
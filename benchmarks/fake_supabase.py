@@ -0,0 +1,327 @@
+"""In-memory stand-in for the parts of Supabase this app talks to.
+
+Serves enough of PostgREST (``/rest/v1``) and Storage (``/storage/v1``) for
+the data layer and profile picture uploads to run unchanged, with no
+network and an optional injected latency per request.
+
+Run with ``python -m benchmarks.fake_supabase --port 54321 --latency-ms 20``
+and point the app at it with ``SUPABASE_URL=http://127.0.0.1:54321``.
+
+Supported: ``select`` (top-level columns only), ``eq``/``neq``/``gt``/
+``gte``/``lt``/``lte``/``in``/``is`` filters (negated with ``not.``, and
+combined with ``or=(...)``/``and(...)``), ``order``, ``limit``,
+``offset``, insert and upsert-ignoring-duplicates (with unique
+constraints), update, delete, and the RPC functions in app/db/*.sql.
+Embedded resources are not.
+"""
+import argparse
+import asyncio
+import random
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+# Columns filled in on insert, and unique columns, per table
+DEFAULTS = {
+    "users": ("created_at", "updated_at"),
+    "token_blacklist": ("created_at",),
+    "boards": ("created_at",),
+    "cards": ("created_at",),
+    "refresh_tokens": ("created_at",),
+}
+UNIQUE = {
+    "users": ("id", "email", "username"),
+    "token_blacklist": ("jti",),
+    "boards": ("id",),
+    "board_columns": ("id",),
+    "cards": ("id",),
+    "refresh_tokens": ("id", "token_hash"),
+}
+# PostgREST ops that are not row filters
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _parse_value(raw: str) -> Any:
+    if raw == "null":
+        return None
+    if raw in ("true", "false"):
+        return raw == "true"
+    return raw
+
+
+def _compare(value: Any, op: str, raw: str) -> bool:
+    if op == "is":
+        return value is _parse_value(raw) or value == _parse_value(raw)
+    if op == "in":
+        return str(value) in [item.strip().strip('"') for item in raw.strip("()").split(",")]
+    if value is None:
+        return False
+    target = type(value)(raw) if isinstance(value, (int, float)) and not isinstance(value, bool) else raw
+    value = value if isinstance(value, (int, float)) else str(value)
+    if op == "eq":
+        return value == target
+    if op == "neq":
+        return value != target
+    if op == "gt":
+        return value > target
+    if op == "gte":
+        return value >= target
+    if op == "lt":
+        return value < target
+    if op == "lte":
+        return value <= target
+    raise ValueError(f"Unsupported operator {op}")
+
+
+def _matches(row: Dict[str, Any], column: str, raw: str) -> bool:
+    negate = raw.startswith("not.")
+    op, value = (raw[4:] if negate else raw).split(".", 1)
+    return _compare(row.get(column), op, value) != negate
+
+
+def _split_top_level(expr: str) -> List[str]:
+    """Split ``a.eq.1,and(b.eq.2,c.eq.3)`` on the commas outside parentheses"""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(expr):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(expr[start:i])
+            start = i + 1
+    parts.append(expr[start:])
+    return parts
+
+
+def _matches_group(row: Dict[str, Any], combine, expr: str) -> bool:
+    """Evaluate the inside of an ``or=(...)``/``and(...)`` group"""
+    results = []
+    for item in _split_top_level(expr):
+        if item.startswith(("and(", "or(")):
+            name, _, inner = item.partition("(")
+            results.append(_matches_group(row, all if name == "and" else any, inner[:-1]))
+        else:
+            results.append(_matches(row, *item.split(".", 1)))
+    return combine(results)
+
+
+class FakeSupabase:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+        self.requests = 0
+
+    async def delay(self):
+        self.requests += 1
+        if self.latency_ms or self.jitter_ms:
+            await asyncio.sleep(max(0.0, self.latency_ms + random.uniform(-1, 1) * self.jitter_ms) / 1000)
+
+    def rows(self, table: str, params) -> List[Dict[str, Any]]:
+        rows = self.tables.setdefault(table, [])
+        filters = [
+            (column, raw)
+            for column, raw in params.multi_items()
+            if column not in RESERVED_PARAMS and "." not in column and "." in raw
+        ]
+
+        def keep(row: Dict[str, Any]) -> bool:
+            for column, raw in filters:
+                if column in ("or", "and"):
+                    if not _matches_group(row, any if column == "or" else all, raw[1:-1]):
+                        return False
+                elif not _matches(row, column, raw):
+                    return False
+            return True
+
+        return [row for row in rows if keep(row)]
+
+    @staticmethod
+    def shape(rows: List[Dict[str, Any]], params) -> List[Dict[str, Any]]:
+        for clause in reversed(params.get("order", "").split(",") if params.get("order") else []):
+            column, _, direction = clause.partition(".")
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            rows = sorted(present, key=lambda r: r[column], reverse=direction.startswith("desc")) + missing
+        offset = int(params.get("offset", 0))
+        limit = params.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit else rows[offset:]
+
+        select = params.get("select", "*")
+        if select == "*":
+            return [dict(row) for row in rows]
+        columns = [c.strip() for c in select.split(",") if c.strip() and "(" not in c]
+        return [{c: row.get(c) for c in columns} for row in rows]
+
+    def insert(self, table: str, new_rows: List[Dict[str, Any]], ignore_duplicates: bool = False) -> Optional[JSONResponse]:
+        rows = self.tables.setdefault(table, [])
+        for new in list(new_rows):
+            for column in UNIQUE.get(table, ("id",)):
+                value = new.get(column)
+                if value is not None and any(row.get(column) == value for row in rows):
+                    if ignore_duplicates:
+                        new_rows.remove(new)
+                        break
+                    return JSONResponse(status_code=409, content={
+                        "code": "23505",
+                        "message": f'duplicate key value violates unique constraint "{table}_{column}_key"',
+                        "details": f"Key ({column})=({value}) already exists.",
+                        "hint": None,
+                    })
+        for new in new_rows:
+            for column in DEFAULTS.get(table, ()):
+                new.setdefault(column, _now())
+            new.setdefault("id", str(uuid.uuid4()))
+            if table == "users":
+                new.setdefault("session_epoch", 0)
+            rows.append(new)
+        return None
+
+    def call(self, function: str, args: Dict[str, Any]) -> Any:
+        if function == "bump_session_epoch":
+            for row in self.tables.get("users", []):
+                if row["id"] == args["target_id"]:
+                    row["session_epoch"] = row.get("session_epoch", 0) + 1
+                    row["updated_at"] = _now()
+                    return row["session_epoch"]
+            return None
+        if function == "acquire_lease":
+            leases = self.tables.setdefault("scheduler_leases", [])
+            now = datetime.now(timezone.utc).timestamp()
+            lease = next((l for l in leases if l["name"] == args["lease_name"]), None)
+            if lease and lease["expires_at"] > now and lease["holder"] != args["lease_holder"]:
+                return False
+            if lease is None:
+                lease = {"name": args["lease_name"]}
+                leases.append(lease)
+            lease.update(holder=args["lease_holder"], expires_at=now + args["ttl_seconds"])
+            return True
+        if function == "respace_ranks":
+            scope = {"board_columns": "board_id", "cards": "column_id"}[args["list_table"]]
+            rows = [r for r in self.tables.get(args["list_table"], []) if r.get(scope) == args["list_id"]]
+            if len(rows) != len(args["new_ranks"]):
+                return -1
+            changed = 0
+            for row, rank in zip(sorted(rows, key=lambda r: (r["rank"], r["id"])), args["new_ranks"]):
+                if row["rank"] != rank:
+                    row["rank"] = rank
+                    changed += 1
+            return changed
+        if function == "purge_expired_tokens":
+            now = _now()
+            rows = self.tables.get("token_blacklist", [])
+            expired = [row for row in rows if row["expires_at"] < now][:args["batch_size"]]
+            ids = {id(row) for row in expired}
+            self.tables["token_blacklist"] = [row for row in rows if id(row) not in ids]
+            return len(expired)
+        raise KeyError(function)
+
+
+def create_app(latency_ms: float = 0.0, jitter_ms: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Fake Supabase")
+    fake = app.state.fake = FakeSupabase(latency_ms, jitter_ms)
+
+    @app.middleware("http")
+    async def inject_latency(request: Request, call_next):
+        await fake.delay()
+        return await call_next(request)
+
+    @app.api_route("/rest/v1/{table}", methods=["GET", "HEAD"])
+    async def select(table: str, request: Request):
+        rows = fake.rows(table, request.query_params)
+        headers = {"Content-Range": f"0-{max(len(rows) - 1, 0)}/{len(rows)}"}
+        if request.query_params.get("select") == "count":
+            return JSONResponse([{"count": len(rows)}], headers=headers)
+        return JSONResponse(fake.shape(rows, request.query_params), headers=headers)
+
+    @app.post("/rest/v1/rpc/{function}")
+    async def rpc(function: str, request: Request):
+        try:
+            return JSONResponse(fake.call(function, await request.json()))
+        except KeyError:
+            return JSONResponse(status_code=404, content={
+                "code": "PGRST202", "message": f"Could not find the function public.{function}", "details": None, "hint": None,
+            })
+
+    @app.post("/rest/v1/{table}")
+    async def insert(table: str, request: Request):
+        body = await request.json()
+        new_rows = [dict(row) for row in (body if isinstance(body, list) else [body])]
+        ignore_duplicates = "resolution=ignore-duplicates" in request.headers.get("prefer", "")
+        error = fake.insert(table, new_rows, ignore_duplicates)
+        if error:
+            return error
+        return JSONResponse(new_rows, status_code=201)
+
+    @app.patch("/rest/v1/{table}")
+    async def update(table: str, request: Request):
+        changes = await request.json()
+        rows = fake.rows(table, request.query_params)
+        for row in rows:
+            row.update(changes)
+            if "updated_at" in DEFAULTS.get(table, ()):
+                row["updated_at"] = _now()
+        return JSONResponse([dict(row) for row in rows])
+
+    @app.delete("/rest/v1/{table}")
+    async def delete(table: str, request: Request):
+        doomed = fake.rows(table, request.query_params)
+        ids = {id(row) for row in doomed}
+        fake.tables[table] = [row for row in fake.tables.get(table, []) if id(row) not in ids]
+        return JSONResponse(doomed)
+
+    @app.post("/storage/v1/object/list/{bucket}")
+    async def list_objects(bucket: str, request: Request):
+        prefix = (await request.json()).get("prefix", "").rstrip("/")
+        names = [path[len(prefix) + 1:] for b, path in fake.objects if b == bucket and path.startswith(prefix + "/")]
+        return JSONResponse([{"name": name, "id": name} for name in names if "/" not in name])
+
+    @app.post("/storage/v1/object/{bucket}/{path:path}")
+    @app.put("/storage/v1/object/{bucket}/{path:path}")
+    async def upload(bucket: str, path: str, request: Request):
+        fake.objects[(bucket, path)] = await request.body()
+        return JSONResponse({"Key": f"{bucket}/{path}"})
+
+    @app.delete("/storage/v1/object/{bucket}")
+    async def remove(bucket: str, request: Request):
+        prefixes = (await request.json()).get("prefixes", [])
+        removed = [p for p in prefixes if fake.objects.pop((bucket, p), None) is not None]
+        return JSONResponse([{"name": p} for p in removed])
+
+    @app.get("/storage/v1/object/public/{bucket}/{path:path}")
+    async def download(bucket: str, path: str):
+        content = fake.objects.get((bucket, path))
+        if content is None:
+            return JSONResponse({"error": "not_found"}, status_code=404)
+        return Response(content)
+
+    @app.get("/_fake/stats")
+    async def stats():
+        return {"requests": fake.requests, "rows": {t: len(r) for t, r in fake.tables.items()}}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Concurrent load driver for the auth and profile picture endpoints.
+
+Starts benchmarks/fake_supabase.py with the requested latency, runs the app
+under uvicorn against it, seeds users, then drives each scenario with a
+fixed number of concurrent clients for a fixed time and reports throughput
+and p50/p95/p99 latency.
+
+Run with ``python -m benchmarks.load --concurrency 32 --duration 10 --latency-ms 10``.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+from benchmarks.harness import FakeSupabaseServer, free_port, report, save_results, summarize, wait_for_port
+from benchmarks.micro import sample_photo
+
+PASSWORD = "correct horse battery staple"
+SCENARIOS = ("signin", "me", "logout", "upload")
+# Every client shares one IP and a few emails, so the login limits would measure only 429s
+NO_RATE_LIMITS = {"RATE_LIMIT_SIGNIN_PER_IP": "", "RATE_LIMIT_SIGNIN_PER_EMAIL": "", "RATE_LIMIT_SIGNUP_PER_IP": ""}
+
+Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+def start_app(env: Dict[str, str], port: int, workers: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env={**os.environ, **NO_RATE_LIMITS, **env},
+    )
+    wait_for_port(port, timeout=60)
+    return process
+
+
+async def seed_users(client: httpx.AsyncClient, count: int) -> List[Dict[str, str]]:
+    async def sign_up(i: int) -> Dict[str, str]:
+        email = f"bench{i}@example.com"
+        response = await client.post("/api/auth/signup", json={
+            "username": f"bench{i}", "email": email, "password": PASSWORD,
+        })
+        response.raise_for_status()
+        return {"email": email, "token": response.json()["access_token"]}
+
+    return list(await asyncio.gather(*[sign_up(i) for i in range(count)]))
+
+
+def build_scenarios(users: List[Dict[str, str]]) -> Dict[str, Request]:
+    from app.core.security import create_access_token
+
+    minted = itertools.count()
+    photos = [sample_photo(800 + i * 16, 600 + i * 12) for i in range(16)]
+
+    def auth(token: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {token}"}
+
+    async def signin(client):
+        user = random.choice(users)
+        return await client.post("/api/auth/signin", json={"email": user["email"], "password": PASSWORD})
+
+    async def me(client):
+        return await client.get("/api/auth/me", headers=auth(random.choice(users)["token"]))
+
+    async def logout(client):
+        # Every logout revokes a token, so each one gets a fresh, distinct token
+        n = next(minted)
+        token = create_access_token(users[n % len(users)]["email"], timedelta(minutes=60, seconds=n))
+        return await client.post("/api/auth/logout", headers=auth(token))
+
+    async def upload(client):
+        files = {"file": ("photo.jpg", random.choice(photos), "image/jpeg")}
+        return await client.put("/api/profile/profile-picture", headers=auth(random.choice(users)["token"]), files=files)
+
+    return {"signin": signin, "me": me, "logout": logout, "upload": upload}
+
+
+def _failed(response: httpx.Response) -> bool:
+    if response.status_code >= 400:
+        return True
+    # /me reports auth failures in the body with a 200
+    return response.headers.get("content-type", "").startswith("application/json") and response.json().get("status") == 401
+
+
+async def drive(client: httpx.AsyncClient, request: Request, concurrency: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                failed = _failed(await request(client))
+            except httpx.HTTPError:
+                failed = True
+            if failed:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+async def run(args, base_url: str) -> Dict[str, Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        users = await seed_users(client, args.users)
+        scenarios = build_scenarios(users)
+
+        results = {}
+        for name in args.scenarios.split(","):
+            # Short warm-up so connection setup and first-use caches are not measured
+            await drive(client, scenarios[name], args.concurrency, min(1.0, args.duration / 5))
+            results[name] = await drive(client, scenarios[name], args.concurrency, args.duration)
+            report(name, results[name])
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test auth and profile endpoints against a fake Supabase")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="injected Supabase latency")
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    parser.add_argument("--output", help="JSON file to write; defaults to benchmarks/results/")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with FakeSupabaseServer(args.latency_ms, args.jitter_ms) as fake:
+        os.environ.update(fake.env)
+        app_port = free_port()
+        app = start_app(fake.env, app_port, args.workers)
+        try:
+            results = asyncio.run(run(args, f"http://127.0.0.1:{app_port}"))
+        finally:
+            app.terminate()
+            app.wait(timeout=30)
+
+    save_results("load", results, vars(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
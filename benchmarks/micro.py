@@ -0,0 +1,114 @@
+"""Micro-benchmarks for the per-request CPU costs of auth and uploads.
+
+Run with ``python -m benchmarks.micro [--output results.json]``. Token
+checks that consult the blacklist run against benchmarks/fake_supabase.py,
+so no network is needed.
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import timedelta
+from io import BytesIO
+from typing import Any, Callable, Dict, List
+
+from benchmarks.harness import FakeSupabaseServer, report, save_results, summarize
+
+
+def measure(fn: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def measure_async(fn: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def sample_photo(width: int = 2400, height: int = 1600) -> bytes:
+    from PIL import Image
+
+    image = Image.radial_gradient("L").resize((width, height)).convert("RGB")
+    output = BytesIO()
+    image.save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+async def run(iterations: int, hash_iterations: int, image_iterations: int) -> Dict[str, Dict[str, Any]]:
+    # Imported late so the app picks up the fake Supabase environment
+    from app.core.security import (
+        create_access_token,
+        decode_access_token,
+        claims_cache,
+        get_password_hash,
+        verify_password,
+        get_password_hash_async,
+        verify_password_async,
+        hashing_pool,
+    )
+    from app.routers.auth import decode_jwt_token
+    from app.services.token_blacklist import token_blacklist
+    from app.services.file_upload import FileUploadService
+
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def record(name: str, stats: Dict[str, Any]):
+        results[name] = stats
+        report(name, stats)
+
+    token = create_access_token("bench@example.com", timedelta(minutes=60))
+    record("create_access_token", measure(
+        lambda: create_access_token("bench@example.com", timedelta(minutes=60)), iterations))
+
+    def cold_decode():
+        claims_cache.discard_all()
+        decode_access_token(token)
+
+    record("decode_access_token_miss", measure(cold_decode, iterations))
+    record("decode_access_token_hit", measure(lambda: decode_access_token(token), iterations))
+
+    await token_blacklist.rebuild()
+    record("decode_jwt_token", await measure_async(lambda: decode_jwt_token(token), iterations))
+
+    hashed = get_password_hash("correct horse battery staple")
+    record("bcrypt_hash", measure(lambda: get_password_hash("correct horse battery staple"), hash_iterations))
+    record("bcrypt_verify", measure(lambda: verify_password("correct horse battery staple", hashed), hash_iterations))
+    record("bcrypt_hash_pool", await measure_async(
+        lambda: get_password_hash_async("correct horse battery staple"), hash_iterations))
+    record("bcrypt_verify_pool", await measure_async(
+        lambda: verify_password_async("correct horse battery staple", hashed), hash_iterations))
+    hashing_pool.shutdown()
+
+    photo = sample_photo()
+    service = FileUploadService()
+    record("resize_image", measure(lambda: service.resize_image(photo), image_iterations))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for auth and image hot paths")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--hash-iterations", type=int, default=20)
+    parser.add_argument("--image-iterations", type=int, default=20)
+    parser.add_argument("--output", help="JSON file to write; defaults to benchmarks/results/")
+    args = parser.parse_args()
+
+    with FakeSupabaseServer() as fake:
+        os.environ.update(fake.env)
+        results = asyncio.run(run(args.iterations, args.hash_iterations, args.image_iterations))
+
+    save_results("micro", results, vars(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
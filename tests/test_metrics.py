@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import API_KEY
+from app.dependencies import API_KEY_NAME
+from app.main import app
+
+
+def test_routed_request_is_recorded_under_its_route():
+    # Not entered as a context manager, so the lifespan (warm-up, Supabase) never runs
+    client = TestClient(app)
+
+    assert client.get("/").status_code == 200
+    assert client.get("/").status_code == 200
+
+    response = client.get("/metrics", headers={API_KEY_NAME: API_KEY})
+    assert response.status_code == 200
+    assert (
+        'flowspace_http_request_duration_seconds_count{method="GET",route="/",status="2xx"} 2'
+        in response.text
+    )